@@ -9,6 +9,7 @@ import serial
 
 from scripts.engine import always_matches
 from scripts.engine import bye
+from scripts.engine import digit_reader
 from scripts.engine import do
 from scripts.engine import get_text
 from scripts.engine import getframe
@@ -30,6 +31,7 @@ _TO_CLOCK = do(
     Press('s', duration=.7),
     Press('A'), Wait(.75),
 )
+_DIGITS = digit_reader('clock')
 
 
 def current_dt(vid: cv2.VideoCapture, ser: serial.Serial) -> datetime.datetime:
@@ -64,16 +66,18 @@ def current_dt(vid: cv2.VideoCapture, ser: serial.Serial) -> datetime.datetime:
 
 def clock(dt: datetime.datetime, name: str, end: str) -> States:
     def _state(tl: Point, br: Point, n: int, s: str, e: str) -> States:
-        found_n = -1
+        found_n: int | None = None
 
         def eq_n(frame: numpy.ndarray) -> bool:
             nonlocal found_n
-            # ocr sometimes has problems with `07` as `O07`
-            n_s = get_text(frame, tl, br, invert=False).lstrip('O0o') or '0'
-            found_n = int(n_s)
+            found_n, _ = _DIGITS(frame, tl, br, invert=False)
             return found_n == n
 
         def move(vid: cv2.VideoCapture, ser: serial.Serial) -> None:
+            if found_n is None:  # unreadable, look again
+                Wait(.3)(vid, ser)
+                return
+
             s = 'w' if n > found_n else 's'
             diff = abs(found_n - n)
             if diff >= 10:
@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import collections
+import ctypes
+import ctypes.util
+import functools
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import threading
+from typing import Protocol
+
+import numpy
+
+# tesseract's PSM_SINGLE_LINE, the same as `--psm 7`
+_PSM_SINGLE_LINE = 7
+# the cli assumes 70 dpi for images without a resolution
+_SOURCE_RESOLUTION = 70
+
+
+class Backend(Protocol):
+    name: str
+
+    def __call__(self, crop: numpy.ndarray) -> str: ...
+
+
+def _pgm(crop: numpy.ndarray) -> bytes:
+    # binary pgm is a short header followed by the raw rows: no compression
+    height, width = crop.shape
+    header = f'P5\n{width} {height}\n255\n'.encode()
+    return header + numpy.ascontiguousarray(crop, dtype=numpy.uint8).data
+
+
+class Subprocess:
+    """runs the `tesseract` executable once per image"""
+
+    name = 'tesseract'
+
+    def __call__(self, crop: numpy.ndarray) -> str:
+        return subprocess.check_output(
+            ('tesseract', '-', '-', '--psm', str(_PSM_SINGLE_LINE)),
+            input=_pgm(crop),
+            stderr=subprocess.DEVNULL,
+        ).strip().decode()
+
+
+class LibTesseract:
+    """libtesseract loaded in-process through its C api
+
+    the model is loaded once per thread (a `TessBaseAPI` is not safe to share
+    between threads) and reused for every image after that.
+    """
+
+    name = 'libtesseract'
+
+    def __init__(self, path: str) -> None:
+        lib = ctypes.CDLL(path)
+
+        lib.TessBaseAPICreate.restype = ctypes.c_void_p
+        lib.TessBaseAPICreate.argtypes = ()
+        lib.TessBaseAPIInit3.restype = ctypes.c_int
+        lib.TessBaseAPIInit3.argtypes = (
+            ctypes.c_void_p, ctypes.c_char_p, ctypes.c_char_p,
+        )
+        lib.TessBaseAPISetPageSegMode.restype = None
+        lib.TessBaseAPISetPageSegMode.argtypes = (
+            ctypes.c_void_p, ctypes.c_int,
+        )
+        lib.TessBaseAPISetImage.restype = None
+        lib.TessBaseAPISetImage.argtypes = (
+            ctypes.c_void_p, ctypes.c_void_p,
+            ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_int,
+        )
+        lib.TessBaseAPISetSourceResolution.restype = None
+        lib.TessBaseAPISetSourceResolution.argtypes = (
+            ctypes.c_void_p, ctypes.c_int,
+        )
+        # a `c_void_p` (rather than `c_char_p`) so the string can be freed
+        lib.TessBaseAPIGetUTF8Text.restype = ctypes.c_void_p
+        lib.TessBaseAPIGetUTF8Text.argtypes = (ctypes.c_void_p,)
+        lib.TessDeleteText.restype = None
+        lib.TessDeleteText.argtypes = (ctypes.c_void_p,)
+
+        self._lib = lib
+        self._local = threading.local()
+
+    def _api(self) -> int:
+        api = getattr(self._local, 'api', None)
+        if api is None:
+            api = self._lib.TessBaseAPICreate()
+            if self._lib.TessBaseAPIInit3(api, None, b'eng') != 0:
+                raise SystemExit('libtesseract: could not load `eng` model')
+            self._lib.TessBaseAPISetPageSegMode(api, _PSM_SINGLE_LINE)
+            self._local.api = api
+        return api
+
+    def __call__(self, crop: numpy.ndarray) -> str:
+        # tesseract takes a row stride so only the pixels of a row need to
+        # be contiguous (they are for any crop of a thresholded image)
+        if crop.dtype != numpy.uint8 or crop.strides[1] != 1:
+            crop = numpy.ascontiguousarray(crop, dtype=numpy.uint8)
+        height, width = crop.shape
+
+        api = self._api()
+        self._lib.TessBaseAPISetImage(
+            api, crop.ctypes.data, width, height, 1, crop.strides[0],
+        )
+        self._lib.TessBaseAPISetSourceResolution(api, _SOURCE_RESOLUTION)
+        text_p = self._lib.TessBaseAPIGetUTF8Text(api)
+        if not text_p:
+            return ''
+        try:
+            text = ctypes.string_at(text_p)
+        finally:
+            self._lib.TessDeleteText(text_p)
+        return text.strip().decode()
+
+
+@functools.lru_cache(maxsize=1)
+def backend() -> Backend:
+    """the ocr backend: libtesseract if it loads, else the executable
+
+    set `OCR=subprocess` to force the executable.
+    """
+    if os.environ.get('OCR') != 'subprocess':
+        path = ctypes.util.find_library('tesseract')
+        if path is not None:
+            try:
+                return LibTesseract(path)
+            except (OSError, AttributeError):
+                pass  # missing or too old for the C api, try the executable
+
+    if shutil.which('tesseract'):
+        return Subprocess()
+    else:
+        raise SystemExit('need to install `tesseract-ocr`')
+
+
+class Cache:
+    """bounded lru cache of ocr results keyed by a hash of the image
+
+    when `path` is set the cache is read from there on creation and written
+    back by `save` so results survive between runs.
+    """
+
+    def __init__(self, size: int, path: str | None = None) -> None:
+        self.size = size
+        self.path = path
+        self.hits = self.misses = self.evictions = 0
+        self._lock = threading.Lock()
+        self._results: collections.OrderedDict[str, str]
+        self._results = collections.OrderedDict()
+
+        if path is not None and os.path.exists(path):
+            with open(path) as f:
+                self._results.update(json.load(f))
+            self._evict()
+
+    @staticmethod
+    def key(crop: numpy.ndarray, *extra: object) -> str:
+        h = hashlib.blake2b(digest_size=16)
+        h.update(repr((crop.shape, *extra)).encode())
+        h.update(numpy.ascontiguousarray(crop).data)
+        return h.hexdigest()
+
+    def _evict(self) -> None:
+        while len(self._results) > self.size:
+            self._results.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            text = self._results.get(key)
+            if text is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._results.move_to_end(key)
+            return text
+
+    def put(self, key: str, text: str) -> None:
+        with self._lock:
+            self._results[key] = text
+            self._results.move_to_end(key)
+            self._evict()
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        with self._lock:
+            results = dict(self._results)
+        with open(self.path, 'w') as f:
+            json.dump(results, f)
+
+    def stats(self) -> str:
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0.
+        return (
+            f'ocr cache: {self.hits} / {total} hits ({rate:.1%}), '
+            f'{len(self._results)} / {self.size} entries, '
+            f'{self.evictions} evicted'
+        )
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import collections
+import csv
+import json
+import math
+import time
+from typing import Any
+
+
+class Histogram:
+    """timing histogram with logarithmic buckets (in microseconds)
+
+    each power of two is split into `STEPS` buckets so percentiles are
+    within about 4% of the true value.
+    """
+
+    STEPS = 16
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.
+        self.max = 0.
+        self.buckets: collections.Counter[int] = collections.Counter()
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        us = seconds * 1e6 or 1
+        self.buckets[max(0, math.ceil(math.log2(us) * self.STEPS))] += 1
+
+    def merge(self, other: Histogram) -> None:
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        self.buckets.update(other.buckets)
+
+    def percentile(self, p: float) -> float:
+        """upper bound (seconds) of the bucket holding the `p`th percentile"""
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= self.count * p / 100:
+                return min(2 ** (bucket / self.STEPS) / 1e6, self.max)
+        else:
+            return self.max
+
+    def summary(self) -> dict[str, float]:
+        return {
+            'count': self.count,
+            'total': self.total,
+            'mean': self.total / self.count if self.count else 0.,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'max': self.max,
+        }
+
+
+def describe(obj: object) -> str:
+    return getattr(obj, '__qualname__', None) or repr(obj)
+
+
+class Profiler:
+    """collects timings of a `run`
+
+    enabled by setting `PROFILE=path.json` (or `.csv`) in the environment;
+    written when `run` exits or on `SIGUSR1`.
+    """
+
+    def __init__(self, path: str | None) -> None:
+        self.path = path
+        self.enabled = path is not None
+        self.start = time.monotonic()
+        self.frames = 0
+        self.timings: collections.defaultdict[
+            str, collections.defaultdict[str, Histogram],
+        ] = collections.defaultdict(lambda: collections.defaultdict(Histogram))
+        self.transitions: collections.Counter[str] = collections.Counter()
+
+    def record(self, kind: str, name: str, seconds: float) -> None:
+        if self.enabled:
+            self.timings[kind][name].add(seconds)
+
+    def frame(self) -> None:
+        self.frames += 1
+
+    def transition(self, old: str, new: str, seconds: float) -> None:
+        if self.enabled:
+            self.transitions[f'{old} -> {new}'] += 1
+            self.timings['time_to_transition'][old].add(seconds)
+
+    def report(self) -> dict[str, Any]:
+        elapsed = time.monotonic() - self.start
+        return {
+            'elapsed': elapsed,
+            'frames': self.frames,
+            'fps': self.frames / elapsed if elapsed else 0.,
+            'transitions': dict(self.transitions.most_common()),
+            'timings': {
+                kind: {
+                    name: hist.summary()
+                    for name, hist in sorted(
+                        by_name.items(),
+                        key=lambda kv: -kv[1].total,
+                    )
+                }
+                for kind, by_name in self.timings.items()
+            },
+        }
+
+    def dump(self) -> None:
+        if self.path is None:
+            return
+
+        report = self.report()
+        if self.path.endswith('.csv'):
+            fields = ('count', 'total', 'mean', 'p50', 'p90', 'p99', 'max')
+            with open(self.path, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(('kind', 'name', *fields))
+                writer.writerow(('run', 'frames', report['frames']))
+                writer.writerow(('run', 'fps', report['fps']))
+                for name, count in report['transitions'].items():
+                    writer.writerow(('transition', name, count))
+                for kind, by_name in report['timings'].items():
+                    for name, summary in by_name.items():
+                        writer.writerow(
+                            (kind, name, *(summary[k] for k in fields)),
+                        )
+        else:
+            with open(self.path, 'w') as f:
+                json.dump(report, f, indent=2)
+                f.write('\n')
+        print(f'profile written to {self.path}')
@@ -0,0 +1,272 @@
+from __future__ import annotations
+
+import bisect
+import contextlib
+import os
+import queue
+import struct
+import threading
+import time
+from collections.abc import Generator
+from typing import Any
+from typing import Protocol
+from unittest import mock
+
+import cv2
+import numpy
+
+# log format: MAGIC, then records of _HEADER (kind, seconds since the start
+# of the recording, payload length) followed by the payload -- a lossless png
+# for FRAME records, the raw bytes for SERIAL records and nothing for the END
+# record written when the recording is closed
+MAGIC = b'switch-microcontroller log 1\n'
+_HEADER = struct.Struct('<cdI')
+FRAME = b'F'
+SERIAL = b'S'
+END = b'E'
+
+
+class Recorder:
+    """writes the frames the engine sees and the bytes it sends to `path`
+
+    encoding happens on a writer thread; consecutive identical frames are
+    only stored once.  png encoding is slower than a capture device
+    produces frames so frames arriving while `MAX_PENDING` are still waiting
+    to be written are dropped (and counted) rather than slowing down the
+    run.  serial output is never dropped.
+    """
+
+    MAX_PENDING = 4
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.dropped = 0
+        self._queue: queue.Queue[tuple[bytes, float, Any] | None]
+        self._queue = queue.Queue()
+        self._pending = threading.BoundedSemaphore(self.MAX_PENDING)
+        self._thread = threading.Thread(target=self._write, daemon=True)
+        self._start = time.monotonic()
+        self._prev: numpy.ndarray | None = None
+
+    def _put(self, kind: bytes, payload: Any) -> None:
+        if not self._thread.is_alive():
+            self._thread.start()
+        self._queue.put((kind, time.monotonic() - self._start, payload))
+
+    def frame(self, frame: numpy.ndarray) -> None:
+        if self._prev is not None and numpy.array_equal(frame, self._prev):
+            return
+        if not self._pending.acquire(blocking=False):
+            self.dropped += 1
+            return
+        # the caller may draw on its frame after this
+        self._prev = frame.copy()
+        self._put(FRAME, self._prev)
+
+    def serial(self, data: bytes) -> None:
+        self._put(SERIAL, data)
+
+    def close(self) -> None:
+        if self._thread.is_alive():
+            self._put(END, b'')
+            self._queue.put(None)
+            self._thread.join()
+        if self.dropped:
+            print(f'recording: dropped {self.dropped} frames')
+
+    def _write(self) -> None:
+        params = (cv2.IMWRITE_PNG_COMPRESSION, 1)
+        with open(self.path, 'wb') as f:
+            f.write(MAGIC)
+            while (item := self._queue.get()) is not None:
+                kind, t, payload = item
+                if kind == FRAME:
+                    payload = cv2.imencode('.png', payload, params)[1]
+                    payload = payload.tobytes()
+                    self._pending.release()
+                f.write(_HEADER.pack(kind, t, len(payload)))
+                f.write(payload)
+
+
+class Log:
+    """random access to a log written by `Recorder`"""
+
+    def __init__(self, path: str) -> None:
+        self.frames: list[tuple[float, int, int]] = []  # (t, offset, size)
+        self.serial: list[tuple[float, bytes]] = []
+        self.end = 0.
+
+        self._f = open(path, 'rb')
+        if self._f.read(len(MAGIC)) != MAGIC:
+            raise SystemExit(f'{path}: not a recording')
+        while header := self._f.read(_HEADER.size):
+            kind, t, size = _HEADER.unpack(header)
+            self.end = t
+            if kind == FRAME:
+                self.frames.append((t, self._f.tell(), size))
+                self._f.seek(size, 1)
+            elif kind == SERIAL:
+                self.serial.append((t, self._f.read(size)))
+            else:
+                self._f.seek(size, 1)
+
+        self.times = [t for t, _, _ in self.frames]
+
+    def frame(self, i: int) -> numpy.ndarray:
+        _, offset, size = self.frames[i]
+        self._f.seek(offset)
+        buf = numpy.frombuffer(self._f.read(size), dtype=numpy.uint8)
+        frame = cv2.imdecode(buf, cv2.IMREAD_COLOR)
+        assert frame is not None
+        return frame
+
+    def close(self) -> None:
+        self._f.close()
+
+
+class ImageDir:
+    """a directory of screenshots (in name order) shown `1 / fps` apart"""
+
+    def __init__(self, path: str, *, fps: float) -> None:
+        self.paths = sorted(
+            os.path.join(path, name)
+            for name in os.listdir(path)
+            if name.lower().endswith(('.png', '.jpg', '.jpeg'))
+        )
+        self.times = [i / fps for i in range(len(self.paths))]
+        self.end = len(self.paths) / fps
+        self.serial: list[tuple[float, bytes]] = []
+
+    def frame(self, i: int) -> numpy.ndarray:
+        frame = cv2.imread(self.paths[i])
+        assert frame is not None
+        return frame
+
+
+class Clip:
+    """a video file, decoded up front (so keep these short)"""
+
+    def __init__(self, path: str) -> None:
+        vid = cv2.VideoCapture(path)
+        fps = vid.get(cv2.CAP_PROP_FPS) or 30.
+        self._frames = []
+        while True:
+            ok, frame = vid.read()
+            if not ok:
+                break
+            self._frames.append(frame)
+        vid.release()
+
+        self.times = [i / fps for i in range(len(self._frames))]
+        self.end = len(self._frames) / fps
+        self.serial: list[tuple[float, bytes]] = []
+
+    def frame(self, i: int) -> numpy.ndarray:
+        return self._frames[i]
+
+
+class Frames(Protocol):
+    times: list[float]
+    end: float
+    serial: list[tuple[float, bytes]]
+
+    def frame(self, i: int) -> numpy.ndarray: ...
+
+
+def open_frames(path: str, *, fps: float = 30.) -> Frames:
+    """a recording, a directory of screenshots or a video clip"""
+    if os.path.isdir(path):
+        return ImageDir(path, fps=fps)
+    with open(path, 'rb') as f:
+        is_log = f.read(len(MAGIC)) == MAGIC
+    if is_log:
+        return Log(path)
+    else:
+        return Clip(path)
+
+
+class FakeClock:
+    """stands in for `time`: sleeping advances the clock instantly"""
+
+    def __init__(self) -> None:
+        self.now = 0.
+        self._epoch = time.time()
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def time(self) -> float:
+        return self._epoch + self.now
+
+    def sleep(self, t: float) -> None:
+        self.now += max(t, 0.)
+
+    @contextlib.contextmanager
+    def patch(self) -> Generator[None, None, None]:
+        # `perf_counter` is left alone so code can still be timed
+        with (
+                mock.patch.object(time, 'monotonic', self.monotonic),
+                mock.patch.object(time, 'time', self.time),
+                mock.patch.object(time, 'sleep', self.sleep),
+        ):
+            yield
+
+
+class EndOfLog(SystemExit):
+    pass
+
+
+class FakeVideo:
+    """plays back `Frames` against a `FakeClock`
+
+    a read returns the newest frame as of the fake time.  when the clock has
+    not moved since the previous read (the caller is polling without
+    sleeping) the clock jumps to the next frame instead so a replay runs as
+    fast as the engine can process the frames.
+    """
+
+    def __init__(self, frames: Frames, clock: FakeClock) -> None:
+        self.frames = frames
+        self.clock = clock
+        self.i = -1
+        self._last_read = -1.
+
+    def read(self) -> tuple[bool, numpy.ndarray]:
+        times = self.frames.times
+        i = bisect.bisect_right(times, self.clock.now) - 1
+        if i < 0 or (i == self.i and self.clock.now == self._last_read):
+            i += 1
+        if i >= len(times) or self.clock.now > self.frames.end:
+            raise EndOfLog('end of recording')
+
+        self.clock.now = max(self.clock.now, times[i])
+        self.i = i
+        self._last_read = self.clock.now
+        return True, self.frames.frame(i)
+
+    def isOpened(self) -> bool:
+        return True
+
+    def set(self, prop: int, value: float) -> bool:
+        return True
+
+    def release(self) -> None:
+        pass
+
+
+class FakeSerial:
+    """records the bytes written to it (with the fake time they were sent)"""
+
+    def __init__(self, clock: FakeClock, *args: object, **kwargs: object):
+        self.clock = clock
+        self.writes: list[tuple[float, bytes]] = []
+
+    def __enter__(self) -> FakeSerial:
+        return self
+
+    def __exit__(self, *a: object) -> None:
+        pass
+
+    def write(self, bts: bytes) -> int:
+        self.writes.append((self.clock.now, bytes(bts)))
+        return len(bts)
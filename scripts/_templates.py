@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import functools
+import os.path
+from typing import NamedTuple
+
+import cv2
+import numpy
+
+from scripts import engine
+from scripts.engine import full_res
+from scripts.engine import NORM
+from scripts.engine import Point
+from scripts.engine import region
+
+
+class Template:
+    """an image to look for, at the 1280x720 capture size
+
+    pixels of the colour of the top-left pixel (or transparent ones, for
+    images with an alpha channel) are ignored.  the pyramid of the image and
+    its mask is built once, up front.
+    """
+
+    def __init__(self, path: str, *, levels: int = 1) -> None:
+        im = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+        if im is None:
+            raise SystemExit(f'could not read template {path}')
+
+        mask: numpy.ndarray
+        if im.ndim == 3 and im.shape[2] == 4:
+            mask = numpy.where(im[..., 3] > 0, 255, 0).astype(numpy.uint8)
+            im = cv2.cvtColor(im, cv2.COLOR_BGRA2BGR)
+        else:
+            mask = 255 - cv2.inRange(im, im[0][0], im[0][0])
+
+        self.path = path
+        self.pyramid: list[tuple[numpy.ndarray, numpy.ndarray]]
+        self.pyramid = [(im, mask)]
+        for _ in range(levels):
+            im = cv2.pyrDown(im)
+            # keep the mask binary so it still selects whole pixels
+            mask = cv2.resize(
+                mask, (im.shape[1], im.shape[0]),
+                interpolation=cv2.INTER_NEAREST,
+            )
+            if min(im.shape[:2]) < 4:
+                break
+            self.pyramid.append((im, mask))
+
+    @property
+    def size(self) -> tuple[int, int]:
+        """(height, width)"""
+        height, width = self.pyramid[0][0].shape[:2]
+        return height, width
+
+    def __repr__(self) -> str:
+        return f'Template({os.path.basename(self.path)!r})'
+
+
+class Templates:
+    """every template of a script, loaded once from a directory
+
+    templates are looked up by file name without the extension.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self._templates = {
+            os.path.splitext(name)[0]: Template(os.path.join(directory, name))
+            for name in sorted(os.listdir(directory))
+            if name.lower().endswith('.png')
+        }
+
+    def __getitem__(self, name: str) -> Template:
+        return self._templates[name]
+
+
+@functools.lru_cache
+def _templates(directory: str) -> Templates:
+    return Templates(directory)
+
+
+def load_templates(module_file: str) -> Templates:
+    """the `templates/` next to a script (pass its `__file__`)"""
+    directory = os.path.dirname(os.path.abspath(module_file))
+    return _templates(os.path.join(directory, 'templates'))
+
+
+class Found(NamedTuple):
+    point: Point  # the template's top left, in 1280x720 coordinates
+    score: float
+
+
+def _best(
+        haystack: numpy.ndarray,
+        template: numpy.ndarray,
+        mask: numpy.ndarray,
+) -> tuple[int, int, float]:
+    scores = cv2.matchTemplate(
+        haystack, template, cv2.TM_CCOEFF_NORMED, mask=mask,
+    )
+    # flat areas under the mask divide by zero
+    scores = numpy.nan_to_num(scores, nan=-1., posinf=-1., neginf=-1.)
+    _, score, _, (x, y) = cv2.minMaxLoc(scores)
+    return y, x, score
+
+
+def locate(
+        frame: numpy.ndarray,
+        template: Template,
+        top_left: Point,
+        bottom_right: Point,
+) -> Found:
+    """the best match of `template` between `top_left` and `bottom_right`
+
+    the search runs coarse to fine: over the whole region at the smallest
+    pyramid level, then only around that position at each larger one.
+    """
+    frame = full_res(frame)
+    crop = region(frame, top_left, bottom_right)
+    # templates are at the capture size, bring the crop there too
+    if frame.shape[:2] != (NORM.y, NORM.x):
+        crop = cv2.resize(
+            crop,
+            (bottom_right.x - top_left.x, bottom_right.y - top_left.y),
+            interpolation=cv2.INTER_AREA,
+        )
+
+    height, width = template.size
+    if crop.shape[0] < height or crop.shape[1] < width:
+        return Found(top_left, -1.)
+
+    levels = [crop]
+    for im, _ in template.pyramid[1:]:
+        smaller = cv2.pyrDown(levels[-1])
+        if smaller.shape[0] < im.shape[0] or smaller.shape[1] < im.shape[1]:
+            break
+        levels.append(smaller)
+
+    y, x, score = _best(levels[-1], *template.pyramid[len(levels) - 1])
+    for level in reversed(range(len(levels) - 1)):
+        haystack = levels[level]
+        im, mask = template.pyramid[level]
+        # the position is known to within a pixel of the coarser level
+        y0 = max(y * 2 - 2, 0)
+        x0 = max(x * 2 - 2, 0)
+        y1 = min(y * 2 + 2 + im.shape[0], haystack.shape[0])
+        x1 = min(x * 2 + 2 + im.shape[1], haystack.shape[1])
+        dy, dx, score = _best(haystack[y0:y1, x0:x1], im, mask)
+        y, x = y0 + dy, x0 + dx
+
+    return Found(Point(y=top_left.y + y, x=top_left.x + x), score)
+
+
+class MatchTemplate:
+    def __init__(
+            self,
+            template: Template,
+            top_left: Point,
+            bottom_right: Point,
+            *,
+            threshold: float,
+    ) -> None:
+        self.template = template
+        self.top_left = top_left
+        self.bottom_right = bottom_right
+        self.threshold = threshold
+        self.regions = ((top_left, bottom_right),)
+
+    def __call__(self, frame: numpy.ndarray) -> bool:
+        found = engine.MATCH_CACHE.shared(
+            ('template', self.template, self.top_left, self.bottom_right),
+            lambda: locate(
+                frame, self.template, self.top_left, self.bottom_right,
+            ),
+        )
+        return found.score >= self.threshold
+
+    def __repr__(self) -> str:
+        return f'match_template({self.template!r})'
+
+
+def match_template(
+        template: Template,
+        top_left: Point,
+        bottom_right: Point,
+        *,
+        threshold: float = .8,
+) -> MatchTemplate:
+    return MatchTemplate(
+        template, top_left, bottom_right, threshold=threshold,
+    )
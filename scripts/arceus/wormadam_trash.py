@@ -12,6 +12,7 @@ from scripts.engine import Action
 from scripts.engine import all_match
 from scripts.engine import always_matches
 from scripts.engine import Color
+from scripts.engine import derived
 from scripts.engine import do
 from scripts.engine import get_text
 from scripts.engine import make_vid
@@ -45,16 +46,18 @@ def main() -> int:
         timeout = Timeout()
 
         def is_alpha(frame: numpy.ndarray) -> bool:
-            crop = frame[97:111, 962:978]
-            hsv = cv2.cvtColor(crop, cv2.COLOR_BGR2HSV)
+            hsv = derived(frame).hsv(
+                Point(y=97, x=962), Point(y=111, x=978),
+            )
             thres = cv2.inRange(hsv, (168, 25, 25), (180, 255, 255))
             count = numpy.count_nonzero(thres)
             print(f'red pixels: {count}')
             return args.detect_alpha and count > 0
 
         def is_shiny(frame: numpy.ndarray) -> bool:
-            crop = frame[92:117, 929:957]
-            hsv = cv2.cvtColor(crop, cv2.COLOR_BGR2HSV)
+            hsv = derived(frame).hsv(
+                Point(y=92, x=929), Point(y=117, x=957),
+            )
             thres = cv2.inRange(hsv, (0, 0, 0), (255, 255, 215))
             count = numpy.count_nonzero(thres)
 
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os.path
+import subprocess
+import time
+from collections.abc import Iterable
+from typing import Any
+from unittest import mock
+
+from scripts import _ocr
+from scripts import engine
+from scripts._profile import Histogram
+from scripts._profile import Profiler
+from scripts._replay import FakeClock
+from scripts._replay import open_frames
+from scripts.replay import replay
+
+# (result key, label, format)
+COLUMNS = (
+    ('frames', 'frames', '{:.0f}'),
+    ('fps', 'fps', '{:.1f}'),
+    ('state_p50_ms', 'state p50 ms', '{:.2f}'),
+    ('state_p99_ms', 'state p99 ms', '{:.2f}'),
+    ('matcher_p50_ms', 'matcher p50 ms', '{:.3f}'),
+    ('matcher_p90_ms', 'matcher p90 ms', '{:.3f}'),
+    ('matcher_p99_ms', 'matcher p99 ms', '{:.3f}'),
+    ('ocr_calls', 'ocr calls', '{:.0f}'),
+)
+
+
+def _merged(hists: Iterable[Histogram]) -> Histogram:
+    ret = Histogram()
+    for hist in hists:
+        ret.merge(hist)
+    return ret
+
+
+def _commit() -> str:
+    try:
+        out = subprocess.check_output(
+            ('git', 'rev-parse', '--short', 'HEAD'),
+            stderr=subprocess.DEVNULL,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    else:
+        return out.decode().strip()
+
+
+def bench_case(case: dict[str, Any], base: str) -> dict[str, float]:
+    source = os.path.join(base, case['source'])
+    frames = open_frames(source, fps=case.get('fps', 30.))
+    clock = FakeClock()
+
+    profiler = Profiler(None)
+    profiler.enabled = True
+    ocr_cache = _ocr.Cache(engine.OCR_CACHE.size)
+    with (
+            mock.patch.object(engine, 'PROFILER', profiler),
+            mock.patch.object(engine, 'MATCH_CACHE', engine.MatchCache()),
+            mock.patch.object(engine, 'OCR_CACHE', ocr_cache),
+    ):
+        t0 = time.perf_counter()
+        replay(case['module'], case.get('args', []), frames, clock)
+        elapsed = time.perf_counter() - t0
+
+    timings = profiler.timings
+    states = _merged(timings['state'].values())
+    matchers = _merged(timings['matcher'].values())
+    ocr = _merged(timings['ocr'].values())
+    return {
+        'frames': profiler.frames,
+        'fps': profiler.frames / elapsed if elapsed else 0.,
+        'state_p50_ms': states.percentile(50) * 1000,
+        'state_p99_ms': states.percentile(99) * 1000,
+        'matcher_p50_ms': matchers.percentile(50) * 1000,
+        'matcher_p90_ms': matchers.percentile(90) * 1000,
+        'matcher_p99_ms': matchers.percentile(99) * 1000,
+        'ocr_calls': ocr.count,
+    }
+
+
+def _table(
+        results: dict[str, dict[str, float]],
+        baseline: dict[str, dict[str, float]],
+) -> None:
+    width = max((len(name) for name in results), default=4)
+    print(' '.join([f'{"case":<{width}}', *(f'{c[1]:>16}' for c in COLUMNS)]))
+    for name, result in results.items():
+        cells = []
+        for key, _, fmt in COLUMNS:
+            cell = fmt.format(result[key])
+            before = baseline.get(name, {}).get(key)
+            if before:
+                cell = f'{cell} ({(result[key] - before) / before:+.0%})'
+            cells.append(f'{cell:>16}')
+        print(' '.join([f'{name:<{width}}', *cells]))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=(
+            'run scripts offline against screen corpora and report '
+            'throughput, matcher latency and ocr calls.  the manifest is a '
+            'json list of {"name", "module", "args", "source", "fps"} where '
+            'source is a recording (`RECORD=...`), a directory of '
+            'screenshots or a video clip, relative to the manifest'
+        ),
+    )
+    parser.add_argument('manifest')
+    parser.add_argument('--output', help='write results json here')
+    parser.add_argument('--compare', help='results json to compare against')
+    parser.add_argument('--only', action='append', help='run only this case')
+    args = parser.parse_args()
+
+    with open(args.manifest) as f:
+        cases = json.load(f)
+    base = os.path.dirname(os.path.abspath(args.manifest))
+
+    results = {}
+    for case in cases:
+        if args.only and case['name'] not in args.only:
+            continue
+        print(f' {case["name"]} '.center(79, '='))
+        results[case['name']] = bench_case(case, base)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare = json.load(f)
+        print(f'compared to {compare["commit"]}:')
+        baseline = compare['results']
+    else:
+        baseline = {}
+
+    _table(results, baseline)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'commit': _commit(), 'results': results}, f, indent=2)
+            f.write('\n')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -9,6 +9,7 @@ from scripts.engine import Color
 from scripts.engine import get_text
 from scripts.engine import make_vid
 from scripts.engine import Point
+from scripts.engine import recent_frames
 
 
 def main() -> int:
@@ -23,7 +24,8 @@ def main() -> int:
         vid = make_vid()
 
         def getframe() -> numpy.ndarray:
-            return vid.read()[1]
+            (_, frame), = recent_frames(vid, 1)
+            return frame.copy()
 
     pos = Point(y=-1, x=-1)
     start: Point | None = None
@@ -1,42 +1,247 @@
 from __future__ import annotations
 
+import atexit
+import collections
+import concurrent.futures
+import contextlib
+import functools
 import os
-import shutil
-import subprocess
+import re
+import signal
 import sys
+import threading
 import time
+import weakref
+from collections.abc import Callable
+from collections.abc import Generator
+from collections.abc import Hashable
+from collections.abc import Iterable
 from collections.abc import Mapping
+from collections.abc import Sequence
 from typing import NamedTuple
 from typing import NoReturn
 from typing import Protocol
+from typing import TypeVar
 
 import cv2
 import numpy
 import serial
 
+from scripts import _ocr
+from scripts._profile import describe
+from scripts._profile import Profiler
+from scripts._replay import Recorder
+
+T = TypeVar('T')
+
 SERIAL_DEFAULT = 'COM1' if sys.platform == 'win32' else '/dev/ttyUSB0'
 SHOW = not os.environ.get('NOSHOW')
+SHOW_FPS = float(os.environ.get('SHOW_FPS', 15))
+PROFILER = Profiler(os.environ.get('PROFILE'))
+RECORDER = Recorder(os.environ['RECORD']) if 'RECORD' in os.environ else None
+OCR_CACHE = _ocr.Cache(
+    int(os.environ.get('OCR_CACHE_SIZE', 4096)),
+    os.environ.get('OCR_CACHE'),
+)
+atexit.register(OCR_CACHE.save)
+
+
+class Capture:
+    """drains a capture device on a background thread
+
+    opencv buffers frames internally so a synchronous `read()` after a long
+    action (a `Wait`, an ocr call) returns stale frames.  here a thread keeps
+    the last `size` frames (with their capture time) so `getframe` can return
+    the newest one.  `latest` only waits when the newest frame has already
+    been handed out, so a caller polling faster than the device captures
+    does not see (and evaluate) the same frame twice.
+    """
+
+    # seconds to wait for a frame / consecutive failed reads before giving up
+    TIMEOUT = 5.
+    MAX_FAILED_READS = 500
+
+    def __init__(self, vid: cv2.VideoCapture, *, size: int = 8) -> None:
+        self.vid = vid
+        self._frames: collections.deque[tuple[float, numpy.ndarray]]
+        self._frames = collections.deque(maxlen=size)
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._drain, daemon=True)
+        self._error: str | None = None
+        self.seq = 0
+        # `seq` of the frame `latest` returned last
+        self._given = 0
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def _fail(self, error: str) -> None:
+        with self._cond:
+            self._error = error
+            self._cond.notify_all()
+
+    def _drain(self) -> None:
+        failed = 0
+        while not self._stop.is_set():
+            ok, frame = self.vid.read()
+            if not ok:
+                failed += 1
+                if not self.vid.isOpened():
+                    return self._fail('video device went away')
+                elif failed >= self.MAX_FAILED_READS:
+                    return self._fail('no frames from video device')
+                time.sleep(.005)
+                continue
+
+            failed = 0
+            with self._cond:
+                self._frames.append((time.monotonic(), frame))
+                self.seq += 1
+                self._cond.notify_all()
+
+    def _wait(self, predicate: Callable[[], bool]) -> None:
+        # called with `_cond` held
+        ok = self._cond.wait_for(
+            lambda: predicate() or self._error is not None,
+            timeout=self.TIMEOUT,
+        )
+        if self._error is not None:
+            raise SystemExit(self._error)
+        elif not ok:
+            raise SystemExit('no frames from video device')
+
+    def frames(self, n: int) -> list[tuple[float, numpy.ndarray]]:
+        """the last `n` (capture time, frame) pairs, oldest first"""
+        with self._cond:
+            self._wait(lambda: bool(self._frames))
+            return list(self._frames)[-n:]
+
+    def latest(self) -> numpy.ndarray:
+        """the newest frame, waiting for one newer than the last returned"""
+        with self._cond:
+            self._wait(lambda: self.seq > self._given)
+            self._given = self.seq
+            _, frame = self._frames[-1]
+        # callers draw on the frames they get back, keep the buffer pristine
+        return frame.copy()
+
+
+_CAPTURES: dict[cv2.VideoCapture, Capture] = {}
 
 
 def make_vid() -> cv2.VideoCapture:
     vid = cv2.VideoCapture(0)
     vid.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
     vid.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
+
+    capture = _CAPTURES[vid] = Capture(vid)
+    capture.start()
+    atexit.register(capture.stop)
+
     return vid
 
 
+def recent_frames(
+        vid: cv2.VideoCapture,
+        n: int,
+) -> list[tuple[float, numpy.ndarray]]:
+    """the last `n` (capture time, frame) pairs from a `make_vid` device"""
+    return _CAPTURES[vid].frames(n)
+
+
 def require_tesseract() -> None:
-    if not shutil.which('tesseract'):
-        raise SystemExit('need to install `tesseract-ocr`')
+    # loads the model now rather than on the first `get_text`
+    _ocr.backend()(numpy.full((8, 8), 255, dtype=numpy.uint8))
+
+
+class Display:
+    """renders the preview window at no more than `fps` frames per second
+
+    rendering stays on the calling (main) thread -- highgui windows belong
+    to the thread which created them on some backends, and `request_box`
+    drives the same window -- skipped frames simply are not shown so
+    monitoring a run does not slow the run down.  pressing `q` in the
+    window sets `quit`.
+    """
+
+    def __init__(self, *, fps: float) -> None:
+        self.interval = 1 / fps
+        self.quit = threading.Event()
+        self._last = 0.
+
+    def show(self, frame: numpy.ndarray) -> None:
+        now = time.monotonic()
+        if now < self._last + self.interval:
+            return
+        self._last = now
+
+        cv2.imshow('game', frame)
+        if cv2.waitKey(1) & 0xFF == ord('q'):
+            self.quit.set()
+
+
+DISPLAY = Display(fps=SHOW_FPS)
+
+
+def _read(vid: cv2.VideoCapture) -> numpy.ndarray:
+    capture = _CAPTURES.get(vid)
+    if capture is not None:
+        return capture.latest()
+    else:
+        _, frame = vid.read()
+        return frame
+
+
+def _size(s: str | None) -> tuple[int, int] | None:
+    if not s:
+        return None
+    width, _, height = s.partition('x')
+    return int(width), int(height)
+
+
+# `PROCESS_SIZE=640x360` runs the matchers on frames downscaled to that size
+# (`Point.norm` already scales to any frame), `OCR_FULL_RES=1` still crops
+# text from the full size frame.  see `scripts.validate_scale`.
+PROCESS_SIZE = _size(os.environ.get('PROCESS_SIZE'))
+OCR_FULL_RES = bool(os.environ.get('OCR_FULL_RES'))
+_FULL_RES: tuple[numpy.ndarray, numpy.ndarray] | None = None
+
+
+def downscale(frame: numpy.ndarray) -> numpy.ndarray:
+    """`frame` at `PROCESS_SIZE`"""
+    global _FULL_RES
+    if PROCESS_SIZE is None or frame.shape[1::-1] == PROCESS_SIZE:
+        return frame
+
+    small = cv2.resize(frame, PROCESS_SIZE, interpolation=cv2.INTER_AREA)
+    if OCR_FULL_RES:
+        _FULL_RES = (small, frame)
+    return small
+
+
+def full_res(frame: numpy.ndarray) -> numpy.ndarray:
+    """the frame `frame` was downscaled from (with `OCR_FULL_RES`)"""
+    if _FULL_RES is not None and _FULL_RES[0] is frame:
+        return _FULL_RES[1]
+    else:
+        return frame
 
 
 def getframe(vid: cv2.VideoCapture) -> numpy.ndarray:
-    _, frame = vid.read()
+    frame = _read(vid)
+    if RECORDER is not None:
+        RECORDER.frame(frame)
     if SHOW:
-        cv2.imshow('game', frame)
-    if cv2.waitKey(1) & 0xFF == ord('q'):
+        DISPLAY.show(frame)
+    if DISPLAY.quit.is_set():
         raise SystemExit(0)
-    return frame
+    return downscale(frame)
 
 
 def request_box(vid: cv2.VideoCapture) -> tuple[Point, Point]:
@@ -56,8 +261,9 @@ def request_box(vid: cv2.VideoCapture) -> tuple[Point, Point]:
 
     cv2.namedWindow('game')
     cv2.setMouseCallback('game', cb)
+    # interactive: render every frame so the box follows the mouse
     while start is None or end is None:
-        frame = getframe(vid)
+        frame = _read(vid)
         if start is not None:
             cv2.rectangle(
                 frame,
@@ -74,6 +280,23 @@ def request_box(vid: cv2.VideoCapture) -> tuple[Point, Point]:
     return start, end
 
 
+class _RecordingSerial(serial.Serial):
+    """a serial port which also records everything written to it
+
+    with `RECORD` set this replaces `serial.Serial` so bytes written by
+    scripts directly (not through `press`) end up in the recording too.
+    """
+
+    def write(self, b: bytes) -> int | None:  # type: ignore[override]
+        if RECORDER is not None:
+            RECORDER.serial(bytes(b))
+        return super().write(b)
+
+
+if RECORDER is not None:
+    serial.Serial = _RecordingSerial  # type: ignore[misc]
+
+
 def press(ser: serial.Serial, s: str, duration: float) -> None:
     print(f'{s=} {duration=}')
     ser.write(s.encode())
@@ -84,8 +307,9 @@ def press(ser: serial.Serial, s: str, duration: float) -> None:
 
 def wait_and_render(vid: cv2.VideoCapture, t: float) -> None:
     end = time.monotonic() + t
-    while time.monotonic() < end:
+    while (remaining := end - time.monotonic()) > 0:
         getframe(vid)
+        time.sleep(min(remaining, DISPLAY.interval))
 
 
 class Point(NamedTuple):
@@ -93,10 +317,17 @@ class Point(NamedTuple):
     x: int
 
     def norm(self, dims: tuple[int, int, int]) -> Point:
-        return type(self)(
-            int(self.y / NORM.y * dims[0]),
-            int(self.x / NORM.x * dims[1]),
-        )
+        key = (self, dims[0], dims[1])
+        try:
+            return _NORMED[key]
+        except KeyError:
+            if len(_NORMED) >= _NORMED_MAX:
+                _NORMED.clear()
+            ret = _NORMED[key] = type(self)(
+                int(self.y / NORM.y * dims[0]),
+                int(self.x / NORM.x * dims[1]),
+            )
+            return ret
 
     def denorm(self, dims: tuple[int, int, int]) -> Point:
         return type(self)(
@@ -106,6 +337,30 @@ class Point(NamedTuple):
 
 
 NORM = Point(y=720, x=1280)
+# `Point.norm` results and `region` slices by frame (height, width) -- the
+# points come from the scripts so this stays small (it is only bounded in
+# case a script makes up points as it goes)
+_NORMED: dict[tuple[Point, int, int], Point] = {}
+_SLICES: dict[tuple[Point, Point, int, int], tuple[slice, slice]] = {}
+_NORMED_MAX = 1 << 16
+
+
+def region(
+        frame: numpy.ndarray,
+        top_left: Point,
+        bottom_right: Point,
+) -> numpy.ndarray:
+    """the part of `frame` between two (normalized) points"""
+    key = (top_left, bottom_right, frame.shape[0], frame.shape[1])
+    try:
+        slices = _SLICES[key]
+    except KeyError:
+        if len(_SLICES) >= _NORMED_MAX:
+            _SLICES.clear()
+        tl = top_left.norm(frame.shape)
+        br = bottom_right.norm(frame.shape)
+        slices = _SLICES[key] = (slice(tl.y, br.y), slice(tl.x, br.x))
+    return frame[slices]
 
 
 class Color(NamedTuple):
@@ -127,38 +382,571 @@ class Action(Protocol):
         ...
 
 
+def thumbnail(frame: numpy.ndarray, scale: int) -> numpy.ndarray:
+    """cheap downsampled (signed, so it can be diffed) copy of `frame`"""
+    height, width = frame.shape[:2]
+    return cv2.resize(
+        frame,
+        (width // scale, height // scale),
+        interpolation=cv2.INTER_AREA,
+    ).astype(numpy.int16)
+
+
+# (top_left, bottom_right) pairs which a matcher looks at
+Regions = tuple[tuple[Point, Point], ...]
+
+
+def regions_of(matcher: Matcher) -> Regions | None:
+    """the regions `matcher` depends on or `None` if it is opaque"""
+    return getattr(matcher, 'regions', None)
+
+
+class MatchCache:
+    """memoizes matcher results for the frame currently being evaluated
+
+    `run` opens a `frame()` for each frame it reads so that a matcher which
+    appears in several transitions (or inside several `all_match` /
+    `any_match` combinations) is only evaluated once per frame.  outside of
+    a `frame()` the matchers are called directly.
+
+    matchers which declare the `regions` they look at are also remembered
+    across frames: the result is reused until one of those regions changes
+    (compared on a downsampled copy of the frame, or pixel by pixel for
+    regions too small for that to see the pixels a probe reads, exactly for
+    `match_px_exact` regions).  matchers made only of pixel probes are
+    cheaper to evaluate than that comparison and are not remembered.  opaque
+    matchers (plain functions) may depend on more than the frame and are
+    always called.
+    """
+
+    THUMB_SCALE = 4
+    THRESHOLD = 4
+
+    def __init__(self) -> None:
+        self.seq: int | None = None
+        self._next_seq = 0
+        self.results: dict[Matcher, bool] = {}
+        self.hits = 0
+        self.misses = 0
+        self.unchanged = 0
+        # probes evaluated by `prime` (and later looked up), kept out of
+        # `hits` / `misses` so those describe actual reuse
+        self.primed = 0
+        self._primed: dict[Matcher, bool] = {}
+        self._frame: numpy.ndarray | None = None
+        self._thumb: numpy.ndarray | None = None
+        self._retained: weakref.WeakKeyDictionary[
+            Matcher,
+            tuple[bool, numpy.ndarray, list[numpy.ndarray | None]],
+        ] = weakref.WeakKeyDictionary()
+        # `None` for matchers made only of pixel probes, else the regions of
+        # their `match_px_exact` probes
+        self._exact: weakref.WeakKeyDictionary[
+            Matcher, frozenset[tuple[Point, Point]] | None,
+        ] = weakref.WeakKeyDictionary()
+        self._shared: dict[Hashable, object] = {}
+
+    @contextlib.contextmanager
+    def frame(self, frame: numpy.ndarray) -> Generator[int, None, None]:
+        self.seq = self._next_seq
+        self._next_seq += 1
+        self._frame = frame
+        try:
+            yield self.seq
+        finally:
+            self.seq = None
+            self._frame = self._thumb = None
+            self.results.clear()
+            self._primed.clear()
+            self._shared.clear()
+
+    def _thumbnail(self) -> numpy.ndarray:
+        if self._thumb is None:
+            assert self._frame is not None
+            self._thumb = thumbnail(self._frame, self.THUMB_SCALE)
+        return self._thumb
+
+    def _pixels(
+            self,
+            regions: Regions,
+            frame: numpy.ndarray,
+    ) -> list[numpy.ndarray | None]:
+        """copies of the regions smaller than a couple of thumbnail cells"""
+        ret: list[numpy.ndarray | None] = []
+        for top_left, bottom_right in regions:
+            tl = top_left.norm(frame.shape)
+            br = bottom_right.norm(frame.shape)
+            y1 = max(br.y, tl.y + 1)
+            x1 = max(br.x, tl.x + 1)
+            if min(y1 - tl.y, x1 - tl.x) < 2 * self.THUMB_SCALE:
+                ret.append(frame[tl.y:y1, tl.x:x1].astype(numpy.int16))
+            else:
+                ret.append(None)
+        return ret
+
+    def _changed(
+            self,
+            regions: Regions,
+            before: numpy.ndarray,
+            before_pixels: list[numpy.ndarray | None],
+            after: numpy.ndarray,
+            after_pixels: list[numpy.ndarray | None],
+            exact: frozenset[tuple[Point, Point]],
+    ) -> bool:
+        if before.shape != after.shape:
+            return True
+
+        height, width = after.shape[:2]
+        for (top_left, bottom_right), px0, px1 in zip(
+                regions, before_pixels, after_pixels,
+        ):
+            if px0 is not None and px1 is not None:
+                diff = px1 - px0
+                if (top_left, bottom_right) in exact and diff.any():
+                    return True
+            else:
+                y0 = top_left.y * height // NORM.y
+                x0 = top_left.x * width // NORM.x
+                y1 = max(-(-bottom_right.y * height // NORM.y), y0 + 1)
+                x1 = max(-(-bottom_right.x * width // NORM.x), x0 + 1)
+                diff = after[y0:y1, x0:x1] - before[y0:y1, x0:x1]
+            if numpy.abs(diff).max(initial=0) > self.THRESHOLD:
+                return True
+        else:
+            return False
+
+    def _call(self, matcher: Matcher, frame: numpy.ndarray) -> bool:
+        if not PROFILER.enabled:
+            return matcher(frame)
+
+        t0 = time.perf_counter()
+        try:
+            return matcher(frame)
+        finally:
+            elapsed = time.perf_counter() - t0
+            PROFILER.record('matcher', describe(matcher), elapsed)
+
+    def _exact_regions(
+            self,
+            matcher: Matcher,
+    ) -> frozenset[tuple[Point, Point]] | None:
+        try:
+            return self._exact[matcher]
+        except KeyError:
+            if _only_pixel_probes(matcher):
+                ret = None
+            else:
+                ret = frozenset(
+                    probe.regions[0]
+                    for probe in _pixel_probes(matcher)
+                    if probe.exact
+                )
+            self._exact[matcher] = ret
+            return ret
+
+    def _evaluate(self, matcher: Matcher, frame: numpy.ndarray) -> bool:
+        regions = regions_of(matcher)
+        if regions is None:
+            return self._call(matcher, frame)
+        exact = self._exact_regions(matcher)
+        if exact is None:
+            return self._call(matcher, frame)
+
+        thumb = self._thumbnail()
+        pixels = self._pixels(regions, frame)
+        retained = self._retained.get(matcher)
+        if retained is not None:
+            ret, before, before_pixels = retained
+            if not self._changed(
+                    regions, before, before_pixels, thumb, pixels, exact,
+            ):
+                self.unchanged += 1
+                return ret
+
+        ret = self._call(matcher, frame)
+        self._retained[matcher] = (ret, thumb, pixels)
+        return ret
+
+    def shared(self, key: Hashable, compute: Callable[[], T]) -> T:
+        """`compute()`, shared by everything evaluating the current frame"""
+        if self.seq is None:
+            return compute()
+
+        try:
+            return self._shared[key]  # type: ignore[return-value]
+        except KeyError:
+            ret = self._shared[key] = compute()
+            return ret
+
+    def prime(self, batch: _PixelBatch, frame: numpy.ndarray) -> None:
+        """evaluate every pixel probe of `batch` in one go"""
+        if self.seq is None or not batch.matchers:
+            return
+
+        t0 = time.perf_counter()
+        results = batch(frame)
+        PROFILER.record('matcher', 'pixel batch', time.perf_counter() - t0)
+        self._primed.update(zip(batch.matchers, results.tolist()))
+
+    def __call__(self, matcher: Matcher, frame: numpy.ndarray) -> bool:
+        if self.seq is None:
+            return matcher(frame)
+
+        try:
+            ret = self.results[matcher]
+        except KeyError:
+            primed = self._primed.pop(matcher, None)
+            if primed is not None:
+                self.primed += 1
+                ret = self.results[matcher] = primed
+            else:
+                self.misses += 1
+                ret = self.results[matcher] = self._evaluate(matcher, frame)
+        else:
+            self.hits += 1
+        return ret
+
+    def stats(self) -> str:
+        total = self.hits + self.misses + self.primed
+        rate = self.hits / total if total else 0.
+        return (
+            f'match cache: {self.hits} / {total} hits ({rate:.1%}), '
+            f'{self.primed} from pixel batches, '
+            f'{self.unchanged} reused from unchanged regions'
+        )
+
+
+MATCH_CACHE = MatchCache()
+
+
 def always_matches(frame: object) -> bool:
     return True
 
 
+class _ChildStats:
+    def __init__(self) -> None:
+        self.calls = 0.
+        self.decisive = 0.
+        self.elapsed = 0.
+
+    def score(self) -> float:
+        # expected seconds spent per short-circuit -- lower runs first
+        # (never sampled children score 0 so they are measured right away)
+        if not self.calls:
+            return 0.
+        p_decisive = (self.decisive + 1) / (self.calls + 2)
+        return self.elapsed / self.calls / p_decisive
+
+
+class _ShortCircuit:
+    """evaluates matchers until one returns `decisive`
+
+    the children which declare their `regions` (and so are pure) are
+    reordered by their measured cost and how often they short-circuit so
+    cheap selective probes (`match_px`) run before expensive ones
+    (`match_text`).  every `RESAMPLE` calls all of them are evaluated so the
+    statistics of the later children stay current.  opaque children may
+    have side effects: they keep their place after the children written
+    before them and are never called once the result is decided.
+    """
+
+    RESAMPLE = 64
+
+    def __init__(self, matchers: tuple[Matcher, ...], *, decisive: bool):
+        self.matchers = list(matchers)
+        self.decisive = decisive
+        self.regions: Regions | None = ()
+        for matcher in matchers:
+            regions = regions_of(matcher)
+            if regions is None:
+                self.regions = None
+                break
+            else:
+                self.regions += regions
+        self.pure = [regions_of(matcher) is not None for matcher in matchers]
+        self.stats = [_ChildStats() for _ in matchers]
+        self.order = list(range(len(matchers)))
+        self.calls = 0
+
+    def _resort(self) -> None:
+        for stats in self.stats:  # decay so the order tracks recent frames
+            stats.calls /= 2
+            stats.decisive /= 2
+            stats.elapsed /= 2
+
+        # pure children only move within the run between two opaque ones
+        order: list[int] = []
+        run: list[int] = []
+        for i, pure in enumerate(self.pure):
+            if pure:
+                run.append(i)
+            else:
+                order.extend(sorted(run, key=self._score))
+                order.append(i)
+                run.clear()
+        order.extend(sorted(run, key=self._score))
+        self.order = order
+
+    def _score(self, i: int) -> float:
+        return self.stats[i].score()
+
+    def __call__(self, frame: numpy.ndarray) -> bool:
+        self.calls += 1
+        resample = self.calls % self.RESAMPLE == 0
+
+        ret = not self.decisive
+        for i in self.order:
+            if ret is self.decisive and not self.pure[i]:
+                continue
+
+            stats = self.stats[i]
+            t0 = time.perf_counter()
+            result = MATCH_CACHE(self.matchers[i], frame)
+            stats.elapsed += time.perf_counter() - t0
+            stats.calls += 1
+            if bool(result) is self.decisive:
+                stats.decisive += 1
+                ret = self.decisive
+                if not resample:
+                    break
+
+        if resample:
+            self._resort()
+
+        return ret
+
+    def __repr__(self) -> str:
+        name = 'any_match' if self.decisive else 'all_match'
+        return f'{name}({", ".join(map(describe, self.matchers))})'
+
+
 def all_match(*matchers: Matcher) -> Matcher:
-    def all_match_impl(frame: numpy.ndarray) -> bool:
-        return all(matcher(frame) for matcher in matchers)
-    return all_match_impl
+    return _ShortCircuit(matchers, decisive=False)
 
 
 def any_match(*matchers: Matcher) -> Matcher:
-    def any_match_impl(frame: numpy.ndarray) -> bool:
-        return any(matcher(frame) for matcher in matchers)
-    return any_match_impl
+    return _ShortCircuit(matchers, decisive=True)
+
+
+# squared distance under which `match_px` considers colours the same
+_PX_DISTANCE = 2000
+
+
+class MatchPx:
+    exact = False
+
+    def __init__(self, point: Point, *colors: Color) -> None:
+        self.point = point
+        self.colors = colors
+        self.regions = ((point, Point(y=point.y + 1, x=point.x + 1)),)
+        self.probe_colors = numpy.array(colors, dtype=numpy.int32)
+        self.probe_colors = self.probe_colors.reshape(-1, 3)
+
+    def __call__(self, frame: numpy.ndarray) -> bool:
+        px = frame[self.point.norm(frame.shape)].astype(numpy.int32)
+        distance = ((self.probe_colors - px) ** 2).sum(axis=1)
+        return bool((distance < _PX_DISTANCE).any())
+
+    def __repr__(self) -> str:
+        colors = ', '.join(map(repr, self.colors))
+        return f'match_px({self.point!r}, {colors})'
 
 
 def match_px(point: Point, *colors: Color) -> Matcher:
-    def match_px_impl(frame: numpy.ndarray) -> bool:
-        px = frame[point.norm(frame.shape)]
-        for color in colors:
-            if sum((c2 - c1) * (c2 - c1) for c1, c2 in zip(px, color)) < 2000:
-                return True
-        else:
-            return False
-    return match_px_impl
+    return MatchPx(point, *colors)
+
+
+class MatchPxExact:
+    exact = True
+
+    def __init__(self, point: Point, color: Color) -> None:
+        self.point = point
+        self.color = color
+        self.regions = ((point, Point(y=point.y + 1, x=point.x + 1)),)
+        self.probe_colors = numpy.array([color], dtype=numpy.int32)
+
+    def __call__(self, frame: numpy.ndarray) -> bool:
+        px = frame[self.point.norm(frame.shape)].astype(numpy.int32)
+        return bool((px == self.probe_colors[0]).all())
+
+    def __repr__(self) -> str:
+        return f'match_px_exact({self.point!r}, {self.color!r})'
 
 
 def match_px_exact(px: Point, c: Color) -> Matcher:
-    def match_px_exact_impl(frame: numpy.ndarray) -> bool:
-        pt = px.norm(frame.shape)
-        return numpy.array_equal(frame[pt.y][pt.x], c)
-    return match_px_exact_impl
+    return MatchPxExact(px, c)
+
+
+def _pixel_probes(
+        matcher: Matcher,
+) -> Generator[MatchPx | MatchPxExact, None, None]:
+    if isinstance(matcher, (MatchPx, MatchPxExact)):
+        yield matcher
+    elif isinstance(matcher, _ShortCircuit):
+        for child in matcher.matchers:
+            yield from _pixel_probes(child)
+
+
+def _only_pixel_probes(matcher: Matcher) -> bool:
+    if isinstance(matcher, (MatchPx, MatchPxExact)):
+        return True
+    elif isinstance(matcher, _ShortCircuit):
+        return all(_only_pixel_probes(child) for child in matcher.matchers)
+    else:
+        return False
+
+
+class _PixelBatch:
+    """evaluates many `match_px` / `match_px_exact` probes at once
+
+    every probed pixel is read with one gather and compared against every
+    candidate colour in one broadcast.
+    """
+
+    def __init__(self, matchers: Iterable[Matcher]) -> None:
+        probes = dict.fromkeys(
+            probe for m in matchers for probe in _pixel_probes(m)
+        )
+        self.matchers = [m for m in probes if m.probe_colors.size]
+        self.points = list(dict.fromkeys(m.point for m in self.matchers))
+        point_index = {point: i for i, point in enumerate(self.points)}
+
+        n_colors = [len(m.probe_colors) for m in self.matchers]
+        # one row per (matcher, colour) pair
+        self._point = numpy.repeat(
+            [point_index[m.point] for m in self.matchers], n_colors,
+        )
+        self._exact = numpy.repeat([m.exact for m in self.matchers], n_colors)
+        self._colors = numpy.concatenate(
+            [m.probe_colors for m in self.matchers] or
+            [numpy.zeros((0, 3), dtype=numpy.int32)],
+        )
+        self._starts = numpy.cumsum([0, *n_colors[:-1]])
+        self._coords: dict[tuple[int, ...], tuple[numpy.ndarray, ...]] = {}
+
+    def _coords_for(self, shape: tuple[int, ...]) -> tuple[numpy.ndarray, ...]:
+        coords = self._coords.get(shape)
+        if coords is None:
+            dims = (shape[0], shape[1], 3)
+            normed = [point.norm(dims) for point in self.points]
+            coords = self._coords[shape] = (
+                numpy.array([point.y for point in normed], dtype=numpy.intp),
+                numpy.array([point.x for point in normed], dtype=numpy.intp),
+            )
+        return coords
+
+    def __call__(self, frame: numpy.ndarray) -> numpy.ndarray:
+        ys, xs = self._coords_for(frame.shape)
+        pixels = frame[ys, xs].astype(numpy.int32)
+        distance = ((pixels[self._point] - self._colors) ** 2).sum(axis=1)
+        close = numpy.where(
+            self._exact, distance == 0, distance < _PX_DISTANCE,
+        )
+        return numpy.logical_or.reduceat(close, self._starts)
+
+
+class Derived:
+    """colour conversions of one frame, computed on first use
+
+    each representation is available for the whole frame or for a region;
+    a region is sliced out of the whole-frame version when that already
+    exists and converted on its own otherwise.  the returned arrays are
+    shared, don't modify them.
+    """
+
+    def __init__(self, frame: numpy.ndarray) -> None:
+        self.frame = frame
+        self._cache: dict[tuple[object, ...], numpy.ndarray] = {}
+
+    def _convert(
+            self,
+            code: int,
+            top_left: Point | None,
+            bottom_right: Point | None,
+    ) -> numpy.ndarray:
+        full = self._cache.get((code, None, None))
+        if top_left is None or bottom_right is None:
+            if full is None:
+                full = self._cache[(code, None, None)] = cv2.cvtColor(
+                    self.frame, code,
+                )
+            return full
+        elif full is not None:
+            return region(full, top_left, bottom_right)
+
+        key = (code, top_left, bottom_right)
+        ret = self._cache.get(key)
+        if ret is None:
+            crop = region(self.frame, top_left, bottom_right)
+            ret = self._cache[key] = cv2.cvtColor(crop, code)
+        return ret
+
+    def hsv(
+            self,
+            top_left: Point | None = None,
+            bottom_right: Point | None = None,
+    ) -> numpy.ndarray:
+        return self._convert(cv2.COLOR_BGR2HSV, top_left, bottom_right)
+
+    def gray(
+            self,
+            top_left: Point | None = None,
+            bottom_right: Point | None = None,
+    ) -> numpy.ndarray:
+        return self._convert(cv2.COLOR_BGR2GRAY, top_left, bottom_right)
+
+    def binary(
+            self,
+            top_left: Point,
+            bottom_right: Point,
+            *,
+            invert: bool,
+    ) -> numpy.ndarray:
+        """the region's grayscale, otsu thresholded (as read by ocr)"""
+        key = ('binary', top_left, bottom_right, invert)
+        ret = self._cache.get(key)
+        if ret is None:
+            mode = cv2.THRESH_BINARY_INV if invert else cv2.THRESH_BINARY
+            _, ret = cv2.threshold(
+                self.gray(top_left, bottom_right),
+                0, 255, mode | cv2.THRESH_OTSU,
+            )
+            self._cache[key] = ret
+        return ret
+
+
+_DERIVED: Derived | None = None
+
+
+def derived(frame: numpy.ndarray) -> Derived:
+    """the `Derived` of `frame`, shared by everyone looking at that frame"""
+    global _DERIVED
+    if _DERIVED is None or _DERIVED.frame is not frame:
+        _DERIVED = Derived(frame)
+    return _DERIVED
+
+
+def _threshold(
+        frame: numpy.ndarray,
+        top_left: Point,
+        bottom_right: Point,
+        *,
+        invert: bool,
+) -> numpy.ndarray:
+    frame = full_res(frame)
+    return derived(frame).binary(top_left, bottom_right, invert=invert)
+
+
+def _ocr_crop(crop: numpy.ndarray, *key_extra: object) -> str:
+    key = OCR_CACHE.key(crop, *key_extra)
+    ret = OCR_CACHE.get(key)
+    if ret is None:
+        ocr = _ocr.backend()
+        t0 = time.perf_counter()
+        ret = ocr(crop)
+        PROFILER.record('ocr', ocr.name, time.perf_counter() - t0)
+        OCR_CACHE.put(key, ret)
+    return ret
 
 
 def get_text(
@@ -168,22 +956,219 @@ def get_text(
         *,
         invert: bool,
 ) -> str:
-    tl_norm = top_left.norm(frame.shape)
-    br_norm = bottom_right.norm(frame.shape)
+    crop = _threshold(frame, top_left, bottom_right, invert=invert)
+    return _ocr_crop(crop, top_left, bottom_right, invert)
+
 
-    crop = frame[tl_norm.y:br_norm.y, tl_norm.x:br_norm.x]
-    crop = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
-    _, crop = cv2.threshold(
-        crop, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU,
+@functools.lru_cache(maxsize=1)
+def ocr_pool() -> concurrent.futures.ThreadPoolExecutor:
+    """the ocr workers shared by everything in the process
+
+    one per core unless `OCR_WORKERS` is set.  the ocr backends release the
+    gil (or wait on a subprocess) so threads are enough.
+    """
+    workers = int(os.environ.get('OCR_WORKERS', 0)) or os.cpu_count()
+    return concurrent.futures.ThreadPoolExecutor(
+        max_workers=workers,
+        thread_name_prefix='ocr',
     )
-    if invert:
-        crop = cv2.bitwise_not(crop)
 
-    return subprocess.check_output(
-        ('tesseract', '-', '-', '--psm', '7'),
-        input=cv2.imencode('.png', crop)[1].tobytes(),
-        stderr=subprocess.DEVNULL,
-    ).strip().decode()
+
+def get_text_async(
+        frame: numpy.ndarray,
+        top_left: Point,
+        bottom_right: Point,
+        *,
+        invert: bool,
+) -> concurrent.futures.Future[str]:
+    """`get_text` on an ocr worker, `frame` may be reused once this returns"""
+    crop = _threshold(frame, top_left, bottom_right, invert=invert)
+    return ocr_pool().submit(_ocr_crop, crop, top_left, bottom_right, invert)
+
+
+def get_texts(
+        frame: numpy.ndarray,
+        regions: Sequence[tuple[Point, Point, bool]],
+) -> list[str]:
+    """`get_text` for each `(top_left, bottom_right, invert)` region
+
+    the regions are read concurrently.
+    """
+    futures = [
+        get_text_async(frame, tl, br, invert=invert)
+        for tl, br, invert in regions
+    ]
+    return [future.result() for future in futures]
+
+
+CALIBRATE_TEXT = bool(os.environ.get('CALIBRATE_TEXT'))
+
+
+# crops are reduced to this (width, height) before fingerprinting so
+# fingerprints taken at different resolutions are comparable
+_FINGERPRINT_SIZE = (32, 8)
+# largest differences (in fractions of full ink) of a plausible crop
+_FINGERPRINT_INK = .08
+_FINGERPRINT_PROFILE = .12
+
+
+class _Fingerprint(NamedTuple):
+    """ink density and row / column profiles of a thresholded crop"""
+    ink: float
+    rows: numpy.ndarray
+    cols: numpy.ndarray
+
+    @classmethod
+    def of(cls, crop: numpy.ndarray) -> _Fingerprint:
+        small = cv2.resize(
+            crop, _FINGERPRINT_SIZE, interpolation=cv2.INTER_AREA,
+        ) / 255
+        return cls(float(small.mean()), small.mean(axis=1), small.mean(axis=0))
+
+    def near(self, other: _Fingerprint) -> bool:
+        rows = numpy.abs(self.rows - other.rows).mean()
+        cols = numpy.abs(self.cols - other.cols).mean()
+        return (
+            abs(self.ink - other.ink) <= _FINGERPRINT_INK and
+            rows <= _FINGERPRINT_PROFILE and
+            cols <= _FINGERPRINT_PROFILE
+        )
+
+
+def _reference_dir(kind: str) -> str | None:
+    """`kind` next to the module calling our caller (None if it has no file)"""
+    caller = sys._getframe(2).f_globals.get('__file__')
+    if caller is None:
+        return None
+    else:
+        return os.path.join(os.path.dirname(caller), kind)
+
+
+class MatchText:
+    """matches when the text in a region is exactly `text`
+
+    with a `reference_dir`, the thresholded crop is compared against a
+    stored reference image of the text instead of running ocr: a close
+    enough crop matches, a distant one doesn't, and only crops in between
+    fall back to ocr.  references are written by running a script with
+    `CALIBRATE_TEXT=1` (every match is then checked with ocr and its crop
+    saved the first time it matches).
+
+    before either, the crop's fingerprint (ink density and projection
+    profiles) is compared against that of the expected text -- taken from
+    the reference or the first ocr match -- and far off crops are rejected
+    outright.
+    """
+
+    # fraction of differing pixels
+    SAME = .04
+    DIFFERENT = .15
+
+    def __init__(
+            self,
+            text: str,
+            top_left: Point,
+            bottom_right: Point,
+            *,
+            invert: bool,
+            reference_dir: str | None = None,
+    ) -> None:
+        self.text = text
+        self.top_left = top_left
+        self.bottom_right = bottom_right
+        self.invert = invert
+        self.regions = ((top_left, bottom_right),)
+
+        if reference_dir is None:
+            self.reference_path = None
+        else:
+            slug = ''.join(c if c.isalnum() else '_' for c in text)
+            self.reference_path = os.path.join(
+                reference_dir,
+                f'{slug}-{top_left.y}_{top_left.x}-'
+                f'{bottom_right.y}_{bottom_right.x}-{int(invert)}.png',
+            )
+        self._reference: numpy.ndarray | None = None
+        self._reference_loaded = False
+        self._fingerprint: _Fingerprint | None = None
+
+    def _load_reference(self) -> numpy.ndarray | None:
+        if not self._reference_loaded:
+            self._reference_loaded = True
+            if (
+                    self.reference_path is not None and
+                    os.path.exists(self.reference_path)
+            ):
+                self._reference = cv2.imread(
+                    self.reference_path, cv2.IMREAD_GRAYSCALE,
+                )
+                if self._reference is not None:
+                    self._fingerprint = _Fingerprint.of(self._reference)
+        return self._reference
+
+    def _save_reference(self, crop: numpy.ndarray) -> None:
+        assert self.reference_path is not None
+        os.makedirs(os.path.dirname(self.reference_path), exist_ok=True)
+        cv2.imwrite(self.reference_path, crop)
+        print(f'wrote {self.reference_path}')
+        self._reference = crop
+        self._reference_loaded = True
+
+    def _distance(self, crop: numpy.ndarray, ref: numpy.ndarray) -> float:
+        if crop.shape != ref.shape:  # a different capture resolution
+            crop = cv2.resize(
+                crop, (ref.shape[1], ref.shape[0]),
+                interpolation=cv2.INTER_AREA,
+            )
+            crop = numpy.where(crop > 127, 255, 0).astype(numpy.uint8)
+        return numpy.count_nonzero(crop != ref) / crop.size
+
+    def __call__(self, frame: numpy.ndarray) -> bool:
+        # matchers reading the same region of a frame share the work
+        key = (self.top_left, self.bottom_right, self.invert)
+        crop = MATCH_CACHE.shared(
+            ('crop', *key),
+            lambda: _threshold(
+                frame, self.top_left, self.bottom_right, invert=self.invert,
+            ),
+        )
+
+        if not CALIBRATE_TEXT:
+            ref = self._load_reference()
+            if (
+                    self._fingerprint is not None and
+                    not self._fingerprint.near(
+                        MATCH_CACHE.shared(
+                            ('fingerprint', *key),
+                            lambda: _Fingerprint.of(crop),
+                        ),
+                    )
+            ):
+                return False
+            elif ref is not None:
+                distance = self._distance(crop, ref)
+                if distance <= self.SAME:
+                    return True
+                elif distance >= self.DIFFERENT:
+                    return False
+
+        text = MATCH_CACHE.shared(
+            ('text', *key), lambda: _ocr_crop(crop, *key),
+        )
+        matched = self.text == text
+        if matched and self._fingerprint is None:
+            self._fingerprint = _Fingerprint.of(crop)
+        if (
+                matched and
+                CALIBRATE_TEXT and
+                self.reference_path is not None and
+                self._load_reference() is None
+        ):
+            self._save_reference(crop)
+        return matched
+
+    def __repr__(self) -> str:
+        return f'match_text({self.text!r})'
 
 
 def match_text(
@@ -193,9 +1178,176 @@ def match_text(
         *,
         invert: bool,
 ) -> Matcher:
-    def match_text_impl(frame: numpy.ndarray) -> bool:
-        return text == get_text(frame, top_left, bottom_right, invert=invert)
-    return match_text_impl
+    # references are stored next to the script defining the matcher
+    return MatchText(
+        text, top_left, bottom_right,
+        invert=invert, reference_dir=_reference_dir('text_refs'),
+    )
+
+
+class Reading(NamedTuple):
+    value: int | None
+    confidence: float
+
+
+# characters ocr reads in place of digits
+_DIGIT_FIXUPS = str.maketrans({
+    'l': '1', 'I': '1', '|': '1', 'O': '0', 'o': '0', 'A': '4',
+})
+
+
+class DigitReader:
+    """reads the integer in a region from learned glyph templates
+
+    the thresholded crop is split into connected components, each of which is
+    compared against the stored glyphs of one font.  the confidence of a
+    template reading is the similarity of its worst glyph; when there are no
+    templates or the confidence is too low, this falls back to ocr (which
+    reports 1 for a clean read and .5 when characters had to be fixed up or
+    dropped).
+
+    templates are saved by running a script with `CALIBRATE_TEXT=1`: every
+    read then goes through ocr and the glyphs of reads where the digits line
+    up with the components are saved as new samples.
+    """
+
+    GLYPH_SIZE = (12, 16)  # (width, height) glyphs are normalized to
+    MIN_CONFIDENCE = .85
+    MAX_SAMPLES = 8
+    NEW_SAMPLE = .05  # glyphs closer than this to a sample are not saved
+
+    def __init__(self, reference_dir: str | None) -> None:
+        self.reference_dir = reference_dir
+        self._labels: list[str] = []
+        width, height = self.GLYPH_SIZE
+        self._templates = numpy.zeros((0, height, width), dtype=bool)
+        self._loaded = False
+
+    def _add(self, digit: str, glyph: numpy.ndarray) -> None:
+        self._labels.append(digit)
+        self._templates = numpy.concatenate((self._templates, glyph[None]))
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        if self.reference_dir is None or not os.path.isdir(self.reference_dir):
+            return
+        for name in sorted(os.listdir(self.reference_dir)):
+            if name.endswith('.png'):
+                img = cv2.imread(
+                    os.path.join(self.reference_dir, name),
+                    cv2.IMREAD_GRAYSCALE,
+                )
+                if img is not None:
+                    self._add(name[0], img > 127)
+
+    def _glyphs(self, crop: numpy.ndarray) -> list[numpy.ndarray]:
+        # the text is whichever colour is in the minority
+        if numpy.count_nonzero(crop) * 2 > crop.size:
+            fg = (crop == 0).astype(numpy.uint8)
+        else:
+            fg = (crop != 0).astype(numpy.uint8)
+
+        _, _, stats, _ = cv2.connectedComponentsWithStats(fg)
+        boxes = [
+            [x, y, x + w, y + h]
+            for x, y, w, h, area in stats[1:]
+            if area >= 4
+        ]
+        if not boxes:
+            return []
+        max_h = max(y1 - y0 for _, y0, _, y1 in boxes)
+        boxes = sorted(box for box in boxes if box[3] - box[1] >= max_h * .4)
+
+        # pieces of one glyph (a broken stroke) overlap horizontally
+        merged = [boxes[0]]
+        for box in boxes[1:]:
+            prev = merged[-1]
+            overlap = min(prev[2], box[2]) - max(prev[0], box[0])
+            if overlap > min(prev[2] - prev[0], box[2] - box[0]) / 2:
+                prev[:] = [
+                    min(prev[0], box[0]), min(prev[1], box[1]),
+                    max(prev[2], box[2]), max(prev[3], box[3]),
+                ]
+            else:
+                merged.append(box)
+
+        return [
+            cv2.resize(
+                fg[y0:y1, x0:x1] * 255, self.GLYPH_SIZE,
+                interpolation=cv2.INTER_AREA,
+            ) > 127
+            for x0, y0, x1, y1 in merged
+        ]
+
+    def _classify(self, glyphs: list[numpy.ndarray]) -> Reading:
+        # (glyph, template) fraction of differing pixels
+        distance = (
+            numpy.stack(glyphs)[:, None] != self._templates[None]
+        ).mean(axis=(2, 3))
+        digits = ''.join(self._labels[i] for i in distance.argmin(axis=1))
+        return Reading(int(digits), 1 - float(distance.min(axis=1).max()))
+
+    def _learn(self, digits: str, glyphs: list[numpy.ndarray]) -> None:
+        assert self.reference_dir is not None
+        os.makedirs(self.reference_dir, exist_ok=True)
+        for digit, glyph in zip(digits, glyphs):
+            samples = self._templates[
+                [label == digit for label in self._labels]
+            ]
+            if len(samples) >= self.MAX_SAMPLES or (
+                    len(samples) and
+                    (samples != glyph).mean(axis=(1, 2)).min() <
+                    self.NEW_SAMPLE
+            ):
+                continue
+            path = os.path.join(
+                self.reference_dir, f'{digit}-{len(samples)}.png',
+            )
+            cv2.imwrite(path, glyph.astype(numpy.uint8) * 255)
+            print(f'wrote {path}')
+            self._add(digit, glyph)
+
+    def __call__(
+            self,
+            frame: numpy.ndarray,
+            top_left: Point,
+            bottom_right: Point,
+            *,
+            invert: bool,
+    ) -> Reading:
+        self._load()
+        crop = _threshold(frame, top_left, bottom_right, invert=invert)
+        glyphs = self._glyphs(crop)
+
+        if glyphs and self._labels and not CALIBRATE_TEXT:
+            reading = self._classify(glyphs)
+            if reading.confidence >= self.MIN_CONFIDENCE:
+                return reading
+
+        text = _ocr_crop(crop, top_left, bottom_right, invert)
+        match = re.search(r'\d+', text.translate(_DIGIT_FIXUPS))
+        if match is None:
+            return Reading(None, 0.)
+
+        if (
+                CALIBRATE_TEXT and
+                self.reference_dir is not None and
+                len(match[0]) == len(glyphs)
+        ):
+            self._learn(match[0], glyphs)
+        return Reading(int(match[0]), 1. if match[0] == text else .5)
+
+
+def digit_reader(font: str) -> DigitReader:
+    """a `DigitReader` for one `font` (its glyphs are learned separately)"""
+    # templates are stored next to the script creating the reader
+    reference_dir = _reference_dir('digit_refs')
+    if reference_dir is None:
+        return DigitReader(None)
+    else:
+        return DigitReader(os.path.join(reference_dir, font))
 
 
 def bye(vid: object, ser: object) -> None:
@@ -231,9 +1383,102 @@ class Wait(NamedTuple):
         wait_and_render(vid, self.d)
 
 
+# how often `WaitFor` / `WaitStill` look at the screen (about every frame,
+# independent of how often the preview is drawn)
+_POLL_INTERVAL = 1 / 30
+
+
+def _record_wait(timeout: float, t0: float) -> None:
+    elapsed = time.monotonic() - t0
+    PROFILER.record('wait', f'{timeout}s', elapsed)
+    print(f'waited {elapsed:.2f}s (at most {timeout}s)')
+
+
+def wait_for(vid: cv2.VideoCapture, matcher: Matcher, timeout: float) -> None:
+    pixels = _PixelBatch((matcher,))
+    t0 = time.monotonic()
+    end = t0 + timeout
+    while (remaining := end - time.monotonic()) > 0:
+        frame = getframe(vid)
+        with MATCH_CACHE.frame(frame):
+            MATCH_CACHE.prime(pixels, frame)
+            if MATCH_CACHE(matcher, frame):
+                break
+        time.sleep(min(remaining, _POLL_INTERVAL))
+    _record_wait(timeout, t0)
+
+
+def wait_still(vid: cv2.VideoCapture, timeout: float, still: float) -> None:
+    t0 = time.monotonic()
+    end = t0 + timeout
+    prev = thumbnail(getframe(vid), MatchCache.THUMB_SCALE)
+    # the game may not have reacted yet: only stillness after a change counts
+    still_since: float | None = None
+    while (remaining := end - time.monotonic()) > 0:
+        time.sleep(min(remaining, _POLL_INTERVAL))
+        thumb = thumbnail(getframe(vid), MatchCache.THUMB_SCALE)
+        now = time.monotonic()
+        if numpy.abs(thumb - prev).mean() > 1:
+            still_since = now
+        elif still_since is not None and now - still_since >= still:
+            break
+        prev = thumb
+    _record_wait(timeout, t0)
+
+
+class WaitFor(NamedTuple):
+    """wait until `matcher` passes, but at most `timeout` seconds"""
+    matcher: Matcher
+    timeout: float
+
+    def __call__(self, vid: cv2.VideoCapture, ser: serial.Serial) -> None:
+        wait_for(vid, self.matcher, self.timeout)
+
+
+class WaitStill(NamedTuple):
+    """wait for the screen to change and settle, at most `timeout` seconds
+
+    useful after starting an animation which the next state polls for the
+    end of anyway.  a screen which never changes waits the full `timeout`.
+    """
+    timeout: float
+    still: float = .5
+
+    def __call__(self, vid: cv2.VideoCapture, ser: serial.Serial) -> None:
+        wait_still(vid, self.timeout, self.still)
+
+
 States = Mapping[str, tuple[tuple[Matcher, Action, str], ...]]
 
 
+class _Plan:
+    """how one state's transitions are evaluated on a frame
+
+    the pixel probes of every transition (also those nested in `all_match` /
+    `any_match`) are read together up front.  the transitions are then
+    resolved in priority order from the match cache: `match_text`s reading
+    the same region share its crop and ocr result, and opaque matchers are
+    simply called.  must be called inside a `MATCH_CACHE.frame()`.
+    """
+
+    def __init__(
+            self,
+            state: str,
+            transitions: tuple[tuple[Matcher, Action, str], ...],
+    ) -> None:
+        self.state = state
+        self.transitions = transitions
+        self.pixels = _PixelBatch(matcher for matcher, _, _ in transitions)
+
+    def __call__(self, frame: numpy.ndarray) -> tuple[Action, str] | None:
+        MATCH_CACHE.prime(self.pixels, frame)
+        for matcher, action, new_state in self.transitions:
+            if MATCH_CACHE(matcher, frame):
+                return action, new_state
+        else:
+            return None
+
+
 def run(
         *,
         vid: cv2.VideoCapture,
@@ -255,20 +1500,46 @@ def run(
     if missing:
         raise AssertionError(f'missing states: {", ".join(missing)}')
 
+    if PROFILER.enabled and hasattr(signal, 'SIGUSR1'):
+        signal.signal(signal.SIGUSR1, lambda *_: PROFILER.dump())
+
+    plans = {k: _Plan(k, v) for k, v in states.items()}
+
     t0 = time.monotonic()
     state = initial
 
-    while True:
-        frame = getframe(vid)
+    try:
+        while True:
+            frame = getframe(vid)
+            PROFILER.frame()
 
-        for matcher, action, new_state in states[state]:
-            if matcher(frame):
+            t_state = time.perf_counter()
+            with MATCH_CACHE.frame(frame):
+                transition = plans[state](frame)
+            PROFILER.record('state', state, time.perf_counter() - t_state)
+
+            if transition is not None:
+                action, new_state = transition
+                t_action = time.perf_counter()
                 action(vid, ser)
+                PROFILER.record(
+                    'action',
+                    f'{state} -> {new_state}',
+                    time.perf_counter() - t_action,
+                )
                 if new_state != state:
                     print(f'=> {new_state}')
+                    in_state = time.monotonic() - t0
+                    PROFILER.transition(state, new_state, in_state)
                     state = new_state
                     t0 = time.monotonic()
-                break
 
-        if time.monotonic() > t0 + transition_timeout:
-            raise SystemExit(f'stalled in state {state}')
+            if time.monotonic() > t0 + transition_timeout:
+                raise SystemExit(f'stalled in state {state}')
+    finally:
+        print(MATCH_CACHE.stats())
+        if OCR_CACHE.hits or OCR_CACHE.misses:
+            print(OCR_CACHE.stats())
+        PROFILER.dump()
+        if RECORDER is not None:
+            RECORDER.close()
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import argparse
+import runpy
+import sys
+import time
+from unittest import mock
+
+import serial
+
+from scripts import engine
+from scripts._replay import FakeClock
+from scripts._replay import FakeSerial
+from scripts._replay import FakeVideo
+from scripts._replay import Frames
+from scripts._replay import open_frames
+
+
+def replay(
+        module: str,
+        argv: list[str],
+        frames: Frames,
+        clock: FakeClock,
+) -> list[FakeSerial]:
+    """run `module` as `__main__` against `frames`, returns its serial ports"""
+    sers: list[FakeSerial] = []
+
+    def make_vid() -> FakeVideo:
+        return FakeVideo(frames, clock)
+
+    def make_serial(*a: object, **k: object) -> FakeSerial:
+        ser = FakeSerial(clock)
+        sers.append(ser)
+        return ser
+
+    with (
+            clock.patch(),
+            mock.patch.object(engine, 'SHOW', False),
+            mock.patch.object(engine, 'make_vid', make_vid),
+            mock.patch.object(serial, 'Serial', make_serial),
+            mock.patch.object(sys, 'argv', [module, *argv]),
+    ):
+        try:
+            runpy.run_module(module, run_name='__main__')
+        except SystemExit as e:
+            print(f'script exited: {e}')
+
+    return sers
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=(
+            'replay a recording (made with `RECORD=path`) through a script '
+            'and compare what it sends to the recorded serial output'
+        ),
+    )
+    parser.add_argument('log')
+    parser.add_argument('module', help='for example `scripts.sv.hatch`')
+    parser.add_argument('args', nargs=argparse.REMAINDER)
+    args = parser.parse_args()
+
+    frames = open_frames(args.log)
+    clock = FakeClock()
+
+    t0 = time.perf_counter()
+    sers = replay(args.module, args.args, frames, clock)
+    elapsed = time.perf_counter() - t0
+
+    speed = clock.now / elapsed if elapsed else 0.
+    print(
+        f'replayed {clock.now:.1f}s of recording in {elapsed:.1f}s '
+        f'({speed:.1f}x)',
+    )
+
+    sent = b''.join(bts for ser in sers for _, bts in ser.writes)
+    recorded = b''.join(bts for _, bts in frames.serial)
+    # the replay may send a little more right as the recording ends
+    if sent.startswith(recorded):
+        print(f'serial output matches the recording ({len(recorded)} bytes)')
+        return 0
+    else:
+        i = next(
+            (i for i, (a, b) in enumerate(zip(sent, recorded)) if a != b),
+            min(len(sent), len(recorded)),
+        )
+        print(
+            f'serial output diverges at byte {i}: '
+            f'sent {sent[i:i + 10]!r}, recorded {recorded[i:i + 10]!r}',
+        )
+        return 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -16,6 +16,7 @@ from scripts._timeout import Timeout
 from scripts.engine import all_match
 from scripts.engine import always_matches
 from scripts.engine import Color
+from scripts.engine import derived
 from scripts.engine import do
 from scripts.engine import make_vid
 from scripts.engine import match_px
@@ -29,11 +30,7 @@ from scripts.sv._bootup import bootup
 
 
 def rain(frame: numpy.ndarray) -> bool:
-    tl = Point(y=191, x=963).norm(frame.shape)
-    br = Point(y=329, x=1171).norm(frame.shape)
-
-    crop = frame[tl.y:br.y, tl.x:br.x]
-    hsv = cv2.cvtColor(crop, cv2.COLOR_BGR2HSV)
+    hsv = derived(frame).hsv(Point(y=191, x=963), Point(y=329, x=1171))
 
     mask = cv2.inRange(hsv, (0, 0, 125), (180, 255, 255))
     count = int(numpy.count_nonzero(mask))
@@ -45,11 +42,7 @@ def rain(frame: numpy.ndarray) -> bool:
 
 
 def dolliv_shiny(frame: numpy.ndarray) -> bool:
-    tl = Point(y=315, x=748).norm(frame.shape)
-    br = Point(y=351, x=810).norm(frame.shape)
-
-    crop = frame[tl.y:br.y, tl.x:br.x]
-    hsv = cv2.cvtColor(crop, cv2.COLOR_BGR2HSV)
+    hsv = derived(frame).hsv(Point(y=315, x=748), Point(y=351, x=810))
 
     mask_dolliv = cv2.inRange(hsv, (55, 20, 130), (65, 55, 190))
     count_dolliv = int(numpy.count_nonzero(mask_dolliv))
@@ -71,11 +64,7 @@ def save(name: str, frame: numpy.ndarray) -> None:
 
 
 def ignored_pokemon(frame: numpy.ndarray) -> bool:
-    tl = Point(y=315, x=748).norm(frame.shape)
-    br = Point(y=351, x=810).norm(frame.shape)
-
-    crop = frame[tl.y:br.y, tl.x:br.x]
-    hsv = cv2.cvtColor(crop, cv2.COLOR_BGR2HSV)
+    hsv = derived(frame).hsv(Point(y=315, x=748), Point(y=351, x=810))
 
     mask_lilligant = cv2.inRange(hsv, (160, 10, 120), (180, 100, 170))
     count_lilligant = int(numpy.count_nonzero(mask_lilligant))
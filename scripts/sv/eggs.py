@@ -20,6 +20,8 @@ from scripts.engine import require_tesseract
 from scripts.engine import run
 from scripts.engine import SERIAL_DEFAULT
 from scripts.engine import Wait
+from scripts.engine import WaitFor
+from scripts.sv._bootup import world
 
 
 def main() -> int:
@@ -51,7 +53,7 @@ def main() -> int:
     states = {
         'INITIAL': (
             (
-                match_px(Point(y=598, x=1160), Color(b=17, g=203, r=244)),
+                world,
                 do(
                     Wait(1),
                     # center camera
@@ -149,7 +151,7 @@ def main() -> int:
                 always_matches,
                 do(
                     Press('B'), Wait(2), Press('Y'),
-                    Wait(.5), Press('A'), Wait(5),
+                    Wait(.5), Press('A'), WaitFor(world, 5),
                 ),
                 'INITIAL',
             ),
@@ -206,7 +208,7 @@ def main() -> int:
             (
                 # if the timer runs out, restart the egg-grabbing sequence
                 restart_eggs,
-                do(Press('Y'), Wait(.5), Press('A'), Wait(5)),
+                do(Press('Y'), Wait(.5), Press('A'), WaitFor(world, 5)),
                 'INITIAL',
             ),
             (always_matches, do(Wait(60), Press('A'), Wait(.5)), 'MASH_A'),
@@ -15,6 +15,7 @@ from scripts.engine import do
 from scripts.engine import make_vid
 from scripts.engine import Point
 from scripts.engine import Press
+from scripts.engine import region
 from scripts.engine import run
 from scripts.engine import SERIAL_DEFAULT
 from scripts.engine import States
@@ -22,39 +23,122 @@ from scripts.engine import Wait
 from scripts.sv._bootup import bootup
 
 
-def crop_count(crop: numpy.ndarray, *, store: bool = False) -> int:
+# the palette is learned once from the crops saved by earlier (non-shiny,
+# they were reset) checks and reused
+PALETTE = 'dragonite-palette.png'
+PALETTE_CROPS = 50
+PALETTE_MIN_CROPS = 20
+# bits kept per channel when looking up a colour's palette entry
+LUT_BITS = 5
+
+
+class Palette:
+    """colors a crop is quantized to
+
+    every color (at `LUT_BITS` per channel) is mapped to its nearest palette
+    entry up front so quantizing a crop is a single table lookup.
+    """
+
+    def __init__(self, colors: numpy.ndarray) -> None:
+        self.colors = colors
+
+        levels = numpy.arange(1 << LUT_BITS)
+        levels = (levels << (8 - LUT_BITS)) + (1 << (7 - LUT_BITS))
+        grid = numpy.stack(
+            numpy.meshgrid(levels, levels, levels, indexing='ij'),
+            axis=-1,
+        ).reshape((-1, 1, 3))
+        distance = ((grid - colors.astype(numpy.int64)) ** 2).sum(axis=-1)
+        self.lut = distance.argmin(axis=1).astype(numpy.uint8)
+        self.lut = self.lut.reshape((1 << LUT_BITS,) * 3)
+
+        hsv = cv2.cvtColor(colors.reshape((1, -1, 3)), cv2.COLOR_BGR2HSV)
+        orange = cv2.inRange(hsv, (5, 25, 25), (25, 255, 255))
+        self.orange = orange.reshape(-1) > 0
+
+    @classmethod
+    def learn(cls, crops: list[numpy.ndarray]) -> Palette:
+        pxs = numpy.concatenate([crop.reshape((-1, 3)) for crop in crops])
+        pxs = pxs.astype(numpy.float32)
+        k = 10
+        criteria = (cv2.TERM_CRITERIA_MAX_ITER, 25, None)
+        flags = cv2.KMEANS_RANDOM_CENTERS
+        _, _, colors = cv2.kmeans(pxs, k, None, criteria, 10, flags)
+        return cls(colors.round().astype(numpy.uint8))
+
+    def quantize(self, crop: numpy.ndarray) -> numpy.ndarray:
+        q = crop >> (8 - LUT_BITS)
+        return self.lut[q[..., 0], q[..., 1], q[..., 2]]
+
+
+def _mask_sky(crop: numpy.ndarray) -> numpy.ndarray:
     # blank out the sky (sunset can be orange)
     corner = numpy.array([[0, 0], [55, 0], [0, 70]])
     cv2.fillConvexPoly(crop, corner, (0, 0, 0))
+    return crop
 
-    # quantize colors
-    pxs = numpy.float32(crop.reshape((-1, 3)))
-    k = 10
-    criteria = (cv2.TERM_CRITERIA_MAX_ITER, 25, None)
-    flags = cv2.KMEANS_RANDOM_CENTERS
-    _, labels, colors = cv2.kmeans(pxs, k, None, criteria, 10, flags)
 
-    # black out any colors which are too common
-    for i, count in zip(*numpy.unique(labels, return_counts=True)):
-        if count > 1500:
-            colors[i] = numpy.array([0, 0, 0])
+_palette: Palette | None = None
 
-    colors = numpy.uint8(colors)
-    crop = colors[labels.flatten()].reshape(crop.shape)
-    if store:
-        cv2.imwrite('crop-bg.png', crop)
 
-    hsv = cv2.cvtColor(crop, cv2.COLOR_BGR2HSV)
-    thres = cv2.inRange(hsv, (5, 25, 25), (25, 255, 255))
+def palette(crop: numpy.ndarray) -> Palette:
+    """the saved palette, else one learned from `crops/`
+
+    until enough crops have been saved the palette is learned from `crop`
+    alone and thrown away after this check.
+    """
+    global _palette
+    if _palette is not None:
+        return _palette
+
+    if os.path.exists(PALETTE):
+        colors = cv2.imread(PALETTE)
+        assert colors is not None
+        _palette = Palette(colors.reshape((-1, 3)))
+        return _palette
+
+    crops = []
+    if os.path.isdir('crops'):
+        names = sorted(os.listdir('crops'))[-PALETTE_CROPS - 1:]
+        for name in names:
+            saved = cv2.imread(os.path.join('crops', name))
+            if saved is None or saved.shape != crop.shape:
+                continue
+            saved = _mask_sky(saved)
+            # the crop being checked has not been shown to be non-shiny
+            if not numpy.array_equal(saved, crop):
+                crops.append(saved)
+    crops = crops[-PALETTE_CROPS:]
+
+    if len(crops) < PALETTE_MIN_CROPS:
+        return Palette.learn([crop])
+
+    print(f'learning palette from {len(crops)} crops')
+    _palette = Palette.learn(crops)
+    cv2.imwrite(PALETTE, _palette.colors.reshape((1, -1, 3)))
+    return _palette
+
+
+def crop_count(crop: numpy.ndarray, *, store: bool = False) -> int:
+    _mask_sky(crop)
+
+    pal = palette(crop)
+    labels = pal.quantize(crop)
+    counts = numpy.bincount(labels.ravel(), minlength=len(pal.colors))
+
+    # ignore any colors which are too common
+    keep = counts <= 1500
+
     if store:
-        cv2.imwrite('thres.png', thres)
-    return numpy.count_nonzero(thres)
+        colors = numpy.where(keep[:, None], pal.colors, 0).astype(numpy.uint8)
+        cv2.imwrite('crop-bg.png', colors[labels])
+        thres = numpy.where(keep & pal.orange, 255, 0).astype(numpy.uint8)
+        cv2.imwrite('thres.png', thres[labels])
+    return int(counts[keep & pal.orange].sum())
 
 
 def nonshiny_matches(frame: numpy.ndarray) -> bool:
-    tl = Point(y=170, x=438).norm(frame.shape)
-    br = Point(y=281, x=660).norm(frame.shape)
-    crop = frame[tl.y:br.y, tl.x:br.x]
+    crop = region(frame, Point(y=170, x=438), Point(y=281, x=660))
     cv2.imwrite('crop.png', crop)
     os.makedirs('crops', exist_ok=True)
     cv2.imwrite(f'crops/crop-{int(time.time())}.png', crop)
@@ -18,6 +18,7 @@ from scripts.engine import do
 from scripts.engine import make_vid
 from scripts.engine import Point
 from scripts.engine import Press
+from scripts.engine import region
 from scripts.engine import run
 from scripts.engine import SERIAL_DEFAULT
 from scripts.engine import States
@@ -26,16 +27,13 @@ from scripts.sv._bootup import bootup
 
 
 def nontera_matches(frame: numpy.ndarray) -> bool:
-    tl = Point(y=504, x=318)
-    br = Point(y=516, x=328)
-    return numpy.average(frame[tl.y:br.y, tl.x:br.x]) < 235
+    crop = region(frame, Point(y=504, x=318), Point(y=516, x=328))
+    return numpy.average(crop) < 235
 
 
 def nonshiny_matches(frame: numpy.ndarray) -> bool:
     cv2.imwrite('img.png', frame)
-    tl = Point(y=411, x=191)
-    br = Point(y=553, x=313)
-    crop = frame[tl.y:br.y, tl.x:br.x]
+    crop = region(frame, Point(y=411, x=191), Point(y=553, x=313))
     os.makedirs('crops', exist_ok=True)
     cv2.imwrite('crop.png', crop)
     shutil.copy('crop.png', f'crops/crop-{int(time.time())}.png')
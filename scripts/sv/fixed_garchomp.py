@@ -18,6 +18,7 @@ from scripts.engine import do
 from scripts.engine import make_vid
 from scripts.engine import Point
 from scripts.engine import Press
+from scripts.engine import region
 from scripts.engine import run
 from scripts.engine import SERIAL_DEFAULT
 from scripts.engine import States
@@ -26,16 +27,13 @@ from scripts.sv._bootup import bootup
 
 
 def nontera_matches(frame: numpy.ndarray) -> bool:
-    tl = Point(y=256, x=657)
-    br = Point(y=266, x=666)
-    return numpy.average(frame[tl.y:br.y, tl.x:br.x]) < 220
+    crop = region(frame, Point(y=256, x=657), Point(y=266, x=666))
+    return numpy.average(crop) < 220
 
 
 def nonshiny_matches(frame: numpy.ndarray) -> bool:
     cv2.imwrite('img.png', frame)
-    tl = Point(y=83, x=645).norm(frame.shape)
-    br = Point(y=120, x=674).norm(frame.shape)
-    crop = frame[tl.y:br.y, tl.x:br.x]
+    crop = region(frame, Point(y=83, x=645), Point(y=120, x=674))
     os.makedirs('crops', exist_ok=True)
     cv2.imwrite('crop.png', crop)
     shutil.copy('crop.png', f'crops/crop-{int(time.time())}.png')
@@ -21,6 +21,7 @@ from scripts.engine import run
 from scripts.engine import SERIAL_DEFAULT
 from scripts.engine import States
 from scripts.engine import Wait
+from scripts.engine import WaitFor
 from scripts.engine import Write
 from scripts.sv._bootup import world
 from scripts.sv._move_box import move_box
@@ -80,6 +81,12 @@ def main() -> int:
         Point(y=703, x=909),
         invert=True,
     )
+    map_matches = match_text(
+        'Map',
+        Point(y=90, x=226),
+        Point(y=124, x=276),
+        invert=False,
+    )
 
     states: States = {
         **to_boxes('INITIAL', 'PICKUP_TO_COLUMN'),
@@ -117,7 +124,11 @@ def main() -> int:
             (always_matches, do(Press('B'), Wait(1)), 'PICKUP_EXIT_BOX'),
         ),
         'REORIENT_OPEN_MAP': (
-            (world, do(Press('Y'), Wait(5)), 'REORIENT_OPEN_MAP'),
+            (
+                world,
+                do(Press('Y'), WaitFor(map_matches, 5)),
+                'REORIENT_OPEN_MAP',
+            ),
             (always_matches, do(), 'REORIENT_FIND_ZERO'),
         ),
         'REORIENT_FIND_ZERO': (
@@ -138,16 +149,7 @@ def main() -> int:
             ),
         ),
         'REORIENT_MASH_A': (
-            (
-                match_text(
-                    'Map',
-                    Point(y=90, x=226),
-                    Point(y=124, x=276),
-                    invert=False,
-                ),
-                do(Press('A'), Wait(1)),
-                'REORIENT_MASH_A',
-            ),
+            (map_matches, do(Press('A'), Wait(1)), 'REORIENT_MASH_A'),
             (always_matches, do(), 'REORIENT_MOVE'),
         ),
         'REORIENT_MOVE': (
@@ -19,6 +19,7 @@ from scripts.engine import match_px
 from scripts.engine import match_text
 from scripts.engine import Point
 from scripts.engine import Press
+from scripts.engine import region
 from scripts.engine import require_tesseract
 from scripts.engine import run
 from scripts.engine import SERIAL_DEFAULT
@@ -26,33 +27,44 @@ from scripts.engine import Wait
 
 
 RAID_STRIPE_POS = Point(y=147, x=1106)
+TYPE_TL = Point(y=102, x=1006)
+TYPE_BR = Point(y=196, x=1095)
+# (width, height) type icons are compared at
+TYPE_SIZE = (TYPE_BR.x - TYPE_TL.x, TYPE_BR.y - TYPE_TL.y)
 
 
-def _extract_type(
-        im: numpy.ndarray,
-        dims: tuple[int, int, int],
-) -> numpy.ndarray:
-    im = cv2.resize(im, (dims[1], dims[0]))
-
-    top_left = Point(y=102, x=1006).norm(dims)
-    bottom_right = Point(y=196, x=1095).norm(dims)
-    crop = im[top_left.y:bottom_right.y, top_left.x:bottom_right.x]
+def _extract_type(im: numpy.ndarray) -> numpy.ndarray:
+    crop = region(im, TYPE_TL, TYPE_BR)
+    if crop.shape[1::-1] != TYPE_SIZE:
+        crop = cv2.resize(crop, TYPE_SIZE)
 
     color = numpy.array([71, 51, 39])
     t = numpy.array([1, 1, 1])
     return cv2.inRange(crop, color - t * 20, color + t * 20)
 
 
-@functools.lru_cache
-def _get_type_images(
-        dims: tuple[int, int, int],
-) -> tuple[tuple[str, numpy.ndarray], ...]:
+@functools.lru_cache(maxsize=1)
+def _get_type_images() -> tuple[tuple[str, ...], numpy.ndarray]:
+    """the type names and their icon masks stacked into one array"""
     types_dir = os.path.join(os.path.dirname(__file__), 'types')
+    names = tuple(sorted(os.listdir(types_dir)))
+    masks = []
+    for tp in names:
+        im = cv2.imread(os.path.join(types_dir, tp))
+        assert im is not None, tp
+        masks.append(_extract_type(im))
+    return names, numpy.stack(masks)
+
 
-    return tuple(
-        (tp, _extract_type(cv2.imread(os.path.join(types_dir, tp)), dims))
-        for tp in os.listdir(types_dir)
-    )
+def classify_type(frame: numpy.ndarray) -> tuple[str, float]:
+    """the raid's type and its margin over the runner-up
+
+    the margin is the difference in the fraction of matching pixels.
+    """
+    names, masks = _get_type_images()
+    scores = (masks == _extract_type(frame)).mean(axis=(1, 2))
+    second, best = numpy.argsort(scores)[-2:]
+    return names[best], float(scores[best] - scores[second])
 
 
 def main() -> int:
@@ -74,11 +86,8 @@ def main() -> int:
         px = frame[RAID_STRIPE_POS.norm(frame.shape)]
         raid_color = Color(b=int(px[0]), g=int(px[1]), r=int(px[2]))
 
-        type_images = _get_type_images(frame.shape)
-
-        tp_im = _extract_type(frame, frame.shape)
-        _, tp = max(((im == tp_im).mean(), fname) for fname, im in type_images)
-        print(f'the type is {tp}')
+        tp, margin = classify_type(frame)
+        print(f'the type is {tp} (margin: {margin:.3f})')
 
         if tp in {
                 'electric.png', 'grass.png', 'ground.png', 'dragon.png',
@@ -7,19 +7,16 @@ import numpy
 from scripts.engine import always_matches
 from scripts.engine import do
 from scripts.engine import Point
+from scripts.engine import region
 from scripts.engine import States
 
 
 def dialog(frame: numpy.ndarray) -> bool:
-    tl1 = Point(y=587, x=22).norm(frame.shape)
-    br1 = Point(y=604, x=40).norm(frame.shape)
-
-    tl2 = Point(y=587, x=1183).norm(frame.shape)
-    br2 = Point(y=604, x=1200).norm(frame.shape)
-
+    left = region(frame, Point(y=587, x=22), Point(y=604, x=40))
+    right = region(frame, Point(y=587, x=1183), Point(y=604, x=1200))
     return (
-        numpy.all(frame[tl1.y:br1.y, tl1.x:br1.x] == (48, 48, 48)) and
-        numpy.all(frame[tl2.y:br2.y, tl2.x:br2.x] == (59, 59, 59))
+        numpy.all(left == (48, 48, 48)) and
+        numpy.all(right == (59, 59, 59))
     )
 
 
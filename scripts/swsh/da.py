@@ -2,8 +2,7 @@ from __future__ import annotations
 
 import argparse
 import collections
-import functools
-import os.path
+import concurrent.futures
 import re
 
 import cv2
@@ -12,12 +11,19 @@ import serial
 
 from scripts._alarm import alarm
 from scripts._reset import reset
+from scripts._templates import load_templates
+from scripts._templates import locate
 from scripts.engine import all_match
 from scripts.engine import always_matches
 from scripts.engine import any_match
 from scripts.engine import Color
+from scripts.engine import derived
+from scripts.engine import digit_reader
+from scripts.engine import DigitReader
 from scripts.engine import do
 from scripts.engine import get_text
+from scripts.engine import get_text_async
+from scripts.engine import get_texts
 from scripts.engine import getframe
 from scripts.engine import make_vid
 from scripts.engine import match_px
@@ -28,6 +34,7 @@ from scripts.engine import run
 from scripts.engine import SERIAL_DEFAULT
 from scripts.engine import States
 from scripts.engine import Wait
+from scripts.engine import WaitStill
 from scripts.swsh._bootup import bootup
 from scripts.swsh._bootup import world
 
@@ -37,17 +44,16 @@ TYPES = frozenset((
     'poison', 'ground', 'flying', 'psychic', 'bug', 'rock', 'ghost', 'dark',
     'dragon', 'steel', 'fairy',
 ))
-
-
-@functools.lru_cache(maxsize=1)
-def _arrow_mask() -> tuple[numpy.ndarray, numpy.ndarray]:
-    here = os.path.dirname(__file__)
-    tmpl = cv2.imread(os.path.join(here, 'templates', 'move_arrow.png'))
-    mask = 255 - cv2.inRange(tmpl, tmpl[0][0], tmpl[0][0])
-    return tmpl, mask
+ORE_DIGITS = digit_reader('ore')
+STAT_DIGITS = digit_reader('stat')
+POWER_DIGITS = digit_reader('power')
+TEMPLATES = load_templates(__file__)
+MOVES_TL = Point(y=427, x=813)
+MOVES_BR = Point(y=705, x=893)
 
 
 def get_int(
+        reader: DigitReader,
         frame: numpy.ndarray,
         tl: Point,
         br: Point,
@@ -55,13 +61,11 @@ def get_int(
         invert: bool,
         default: int,
 ) -> int:
-    s = get_text(frame, tl, br, invert=invert)
-    # sometimes this text has garbage on it
-    match = re.search(r'\d+', s)
-    if match is not None:
-        return int(match[0])
+    value, _ = reader(frame, tl, br, invert=invert)
+    if value is not None:
+        return value
     else:
-        print(f'!!! could not match int: {s=}')
+        print(f'!!! could not read int at {tl}, {br}')
         return default
 
 
@@ -81,25 +85,45 @@ def main() -> int:
             types.update(parts[1:])
 
     should_reset = True
+    current_ore = 0
+    request_texts: list[concurrent.futures.Future[str]] = []
 
     def should_reset_record(vid: cv2.VideoCapture, ser: serial.Serial) -> None:
+        nonlocal current_ore
+
+        # the ore count decides the reset, look again rather than guess
+        for _ in range(5):
+            frame = getframe(vid)
+            ore, _ = ORE_DIGITS(
+                frame,
+                Point(y=5, x=1209),
+                Point(y=42, x=1276),
+                invert=True,
+            )
+            if ore is not None:
+                current_ore = ore
+                break
+            print('!!! could not read ore, looking again')
+            Wait(.3)(vid, ser)
+        else:
+            raise SystemExit('could not read the ore count')
+
+        # read while the dialog is dismissed, see `should_reset_resolve`
+        request_texts[:] = [
+            get_text_async(
+                frame,
+                Point(y=590, x=575),
+                Point(y=635, x=939),
+                invert=False,
+            ),
+        ]
+
+    def should_reset_resolve(vid: object, ser: object) -> None:
         nonlocal should_reset
 
-        frame = getframe(vid)
-        current_ore_text = get_text(
-            frame,
-            Point(y=5, x=1209),
-            Point(y=42, x=1276),
-            invert=True,
-        )
-        # sometimes the ocr engine gets 1 and l confused
-        current_ore = int(current_ore_text.replace('l', '1').replace('A', '4'))
-        request_text = get_text(
-            frame,
-            Point(y=590, x=575),
-            Point(y=635, x=939),
-            invert=False,
-        )
+        request_text, = (f.result() for f in request_texts)
+        request_texts.clear()
+
         requested_ore = int(request_text.split()[0])
 
         next_ore = min(10, requested_ore + 1)
@@ -117,10 +141,7 @@ def main() -> int:
     def pick_pokemon(vid: cv2.VideoCapture, ser: serial.Serial) -> None:
         frame = getframe(vid)
 
-        chosen_pokemon = 0
-        max_stat = -1
-
-        for i, ((pok_tl, pok_br), locs) in enumerate((
+        choices = (
             (
                 (Point(y=209, x=623), Point(y=235, x=748)),
                 (
@@ -142,15 +163,28 @@ def main() -> int:
                     (Point(y=551, x=972), Point(y=578, x=1023)),
                 ),
             ),
-        )):
-            name = get_text(frame, pok_tl, pok_br, invert=i == 0)
+        )
+        names = get_texts(
+            frame,
+            [
+                (pok_tl, pok_br, i == 0)
+                for i, ((pok_tl, pok_br), _) in enumerate(choices)
+            ],
+        )
+
+        chosen_pokemon = 0
+        max_stat = -1
+
+        for i, (name, (_, locs)) in enumerate(zip(names, choices)):
             print(f'pokemon({i}): {name}')
             if name in {'Unfezant', 'Whiscash', 'Mr. Mime', 'Lilligant'}:
                 print('=> skipping bad pokemon')
                 continue
 
             for tl, br in locs:
-                stat = get_int(frame, tl, br, invert=False, default=0)
+                stat = get_int(
+                    STAT_DIGITS, frame, tl, br, invert=False, default=0,
+                )
                 if stat > max_stat:
                     chosen_pokemon = i
                     max_stat = stat
@@ -231,16 +265,14 @@ def main() -> int:
             do(Press('d'), Wait(.5))(vid, ser)
             pos, _ = _info()
 
-        do(Press('A'), Wait(5))(vid, ser)
+        do(Press('A'), WaitStill(5))(vid, ser)
 
     def best_move(vid: cv2.VideoCapture, ser: serial.Serial) -> None:
         frame = getframe(vid)
 
-        crop = frame[427:705, 813:893]
-        arrow, mask = _arrow_mask()
-        match = cv2.matchTemplate(crop, arrow, cv2.TM_CCOEFF_NORMED, mask=mask)
-        _, _, _, (_, arrow_y) = cv2.minMaxLoc(match)
-        current_move = int(arrow_y / len(crop) * 4)
+        arrow = locate(frame, TEMPLATES['move_arrow'], MOVES_TL, MOVES_BR)
+        arrow_y = arrow.point.y - MOVES_TL.y
+        current_move = int(arrow_y / (MOVES_BR.y - MOVES_TL.y) * 4)
 
         print(f'moving from {current_move=}')
         for _ in range(current_move):
@@ -261,23 +293,28 @@ def main() -> int:
         for i in range(4):
             frame = getframe(vid)
 
-            try:
-                power = 1. * get_int(
-                    frame,
-                    Point(y=324, x=190),
-                    Point(y=351, x=238),
-                    invert=False,
-                    default=0,
-                )
-            except ValueError:
-                power = 0.
+            effective_text, pp_text = get_texts(
+                frame,
+                (
+                    (
+                        Point(y=467 + i * 70, x=918),
+                        Point(y=492 + i * 70, x=1091),
+                        invert_effective,
+                    ),
+                    (Point(y=221, x=705), Point(y=260, x=812), True),
+                ),
+            )
 
-            effective_text = get_text(
+            power = 1. * get_int(
+                POWER_DIGITS,
                 frame,
-                Point(y=467 + i * 70, x=918),
-                Point(y=492 + i * 70, x=1091),
-                invert=invert_effective,
-            ).replace(' ', '').lower()
+                Point(y=324, x=190),
+                Point(y=351, x=238),
+                invert=False,
+                default=0,
+            )
+
+            effective_text = effective_text.replace(' ', '').lower()
             print(f'move {i}: {effective_text}')
 
             if effective_text == 'supereffective':
@@ -287,12 +324,7 @@ def main() -> int:
             elif effective_text == 'noeffect':
                 power = 0.
 
-            pp_s = get_text(
-                frame,
-                Point(y=221, x=705),
-                Point(y=260, x=812),
-                invert=True,
-            ).split('/')[0].strip()
+            pp_s = pp_text.split('/')[0].strip()
             try:
                 pp = int(pp_s)
             except ValueError:
@@ -316,27 +348,46 @@ def main() -> int:
         do(Press('A'), Wait(.75), Press('A'))(vid, ser)
 
     catch = False
+    catch_texts: list[concurrent.futures.Future[str]] = []
 
     def catch_record(vid: cv2.VideoCapture, ser: serial.Serial) -> None:
-        nonlocal catch
-
         frame = getframe(vid)
+        # read while the summary is closed, see `catch_resolve`
+        catch_texts[:] = [
+            get_text_async(
+                frame,
+                Point(y=78, x=259),
+                Point(y=117, x=445),
+                invert=False,
+            ),
+            get_text_async(
+                frame,
+                Point(y=128, x=306),
+                Point(y=153, x=399),
+                invert=True,
+            ),
+            get_text_async(
+                frame,
+                Point(y=128, x=448),
+                Point(y=153, x=545),
+                invert=True,
+            ),
+        ]
 
-        name = get_text(
-            frame,
-            Point(y=78, x=259),
-            Point(y=117, x=445),
-            invert=False,
-        ).lower()
+    def get_type(text: str) -> str:
+        match = WORD.search(text.lower())
+        assert match is not None
+        return match[0]
 
-        def get_type(tl: Point, br: Point) -> str:
-            text = get_text(frame, tl, br, invert=True).lower()
-            match = WORD.search(text)
-            assert match is not None
-            return match[0]
+    def catch_resolve(vid: object, ser: object) -> None:
+        nonlocal catch
+
+        name_text, type1_text, type2_text = (f.result() for f in catch_texts)
+        catch_texts.clear()
 
-        type1 = get_type(Point(y=128, x=306), Point(y=153, x=399))
-        type2 = get_type(Point(y=128, x=448), Point(y=153, x=545))
+        name = name_text.lower()
+        type1 = get_type(type1_text)
+        type2 = get_type(type2_text)
 
         print(f'raw: {(name, type1, type2)}')
         if type2 in TYPES:
@@ -359,14 +410,14 @@ def main() -> int:
         frame = getframe(vid)
 
         old = max(
-            get_int(frame, tl, br, invert=False, default=0)
+            get_int(STAT_DIGITS, frame, tl, br, invert=False, default=0)
             for tl, br in (
                 (Point(y=181, x=1195), Point(y=205, x=1240)),
                 (Point(y=216, x=973), Point(y=244, x=1021)),
             )
         )
         new = max(
-            get_int(frame, tl, br, invert=False, default=0)
+            get_int(STAT_DIGITS, frame, tl, br, invert=False, default=0)
             for tl, br in (
                 (Point(y=366, x=1195), Point(y=390, x=1240)),
                 (Point(y=401, x=973), Point(y=429, x=1021)),
@@ -392,8 +443,7 @@ def main() -> int:
         return summary_counter == 3
 
     def is_shiny(frame: numpy.ndarray) -> bool:
-        crop = frame[382:417, 97:184]
-        hsv = cv2.cvtColor(crop, cv2.COLOR_BGR2HSV)
+        hsv = derived(frame).hsv(Point(y=382, x=97), Point(y=417, x=184))
         thres = cv2.inRange(hsv, (168, 25, 25), (172, 255, 255))
         count = numpy.count_nonzero(thres)
         ret = count > 0
@@ -459,6 +509,7 @@ def main() -> int:
                     should_reset_record,
                     Press('A'), Wait(1),
                     Press('A'), Wait(1),
+                    should_reset_resolve,
                 ),
                 'INITIAL',
             ),
@@ -507,6 +558,7 @@ def main() -> int:
                     catch_record,
                     Press('B'), Wait(1),
                     Press('B'), Wait(1),
+                    catch_resolve,
                 ),
                 'BATTLE',
             ),
@@ -535,7 +587,7 @@ def main() -> int:
                         invert=True,
                     ),
                 ),
-                do(Press('B'), Wait(3)),
+                do(Press('B'), WaitStill(3)),
                 'OVERWORLD',
             ),
             (
@@ -548,7 +600,7 @@ def main() -> int:
                         invert=True,
                     ),
                 ),
-                do(Press('A'), Wait(3)),
+                do(Press('A'), WaitStill(3)),
                 'OVERWORLD',
             ),
         ),
@@ -689,7 +741,7 @@ def main() -> int:
         'REWARD': (
             (
                 reward_header,
-                do(Press('A'), Wait(5), should_reset_clear),
+                do(Press('A'), WaitStill(5), should_reset_clear),
                 'WAIT_FOR_AFTER_TEXT',
             ),
         ),
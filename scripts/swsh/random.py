@@ -13,6 +13,7 @@ from scripts._reset import reset
 from scripts.engine import all_match
 from scripts.engine import always_matches
 from scripts.engine import Color
+from scripts.engine import derived
 from scripts.engine import do
 from scripts.engine import make_vid
 from scripts.engine import match_px
@@ -81,7 +82,7 @@ def main() -> int:
         if time.monotonic() < debounce_t:
             return False
 
-        h = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+        h = derived(frame).hsv()
         m = cv2.inRange(h, (164, 100, 200), (180, 200, 255))
         kernel = numpy.ones((12, 4), numpy.uint8)
         m = cv2.morphologyEx(m, cv2.MORPH_CLOSE, kernel)
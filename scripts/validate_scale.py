@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import argparse
+import collections
+from collections.abc import Generator
+from unittest import mock
+
+import numpy
+
+from scripts import engine
+from scripts._profile import describe
+from scripts._replay import FakeClock
+from scripts._replay import Frames
+from scripts._replay import open_frames
+from scripts.replay import replay
+
+
+def _leaves(
+        matcher: engine.Matcher,
+) -> Generator[engine.Matcher, None, None]:
+    if isinstance(matcher, engine._ShortCircuit):
+        for child in matcher.matchers:
+            yield from _leaves(child)
+    elif matcher is not engine.always_matches:
+        yield matcher
+
+
+class _Indexed:
+    """`Frames` which remembers the index of the frame read last"""
+
+    def __init__(self, frames: Frames) -> None:
+        self.frames = frames
+        self.times = frames.times
+        self.end = frames.end
+        self.serial = frames.serial
+        self.last = -1
+
+    def frame(self, i: int) -> numpy.ndarray:
+        self.last = i
+        return self.frames.frame(i)
+
+
+def capture(
+        module: str,
+        argv: list[str],
+        frames: Frames,
+        *,
+        limit: int,
+) -> list[tuple[str, list[engine.Matcher], int]]:
+    """the (state, matchers, frame index) of each state evaluated in a replay
+
+    frames are re-read by index later rather than kept: there are a lot of
+    them and matchers may draw on the ones they are given.
+    """
+    captured: list[tuple[str, list[engine.Matcher], int]] = []
+    indexed = _Indexed(frames)
+    plan_call = engine._Plan.__call__
+
+    def capture_call(
+            plan: engine._Plan,
+            frame: numpy.ndarray,
+    ) -> tuple[engine.Action, str] | None:
+        if len(captured) < limit:
+            matchers = [matcher for matcher, _, _ in plan.transitions]
+            captured.append((plan.state, matchers, indexed.last))
+        return plan_call(plan, frame)
+
+    with (
+            mock.patch.object(engine, 'PROCESS_SIZE', None),
+            mock.patch.object(engine._Plan, '__call__', capture_call),
+    ):
+        replay(module, argv, indexed, FakeClock())
+
+    return captured
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=(
+            'replay a recording through a script, then re-run the matchers '
+            'of every evaluated state on the same screens at reduced '
+            '`PROCESS_SIZE`s and report the ones whose verdict changes'
+        ),
+    )
+    parser.add_argument('log', help='a recording, screenshot dir or clip')
+    parser.add_argument('module', help='for example `scripts.sv.hatch`')
+    parser.add_argument('args', nargs=argparse.REMAINDER)
+    parser.add_argument(
+        '--size', action='append', type=engine._size, dest='sizes',
+        help='WIDTHxHEIGHT to check (repeatable, default 640x360 426x240)',
+    )
+    parser.add_argument('--fps', type=float, default=30.)
+    parser.add_argument('--limit', type=int, default=500)
+    parser.add_argument(
+        '--opaque', action='store_true',
+        help=(
+            'also re-run plain function matchers (only do this for scripts '
+            'whose custom matchers have no side effects)'
+        ),
+    )
+    args = parser.parse_args()
+    sizes = args.sizes or [(640, 360), (426, 240)]
+
+    frames = open_frames(args.log, fps=args.fps)
+    captured = capture(args.module, args.args, frames, limit=args.limit)
+    print(f'captured {len(captured)} state evaluations')
+
+    checked: collections.Counter[tuple[str, str]] = collections.Counter()
+    changed: collections.Counter[tuple[str, str, tuple[int, int]]]
+    changed = collections.Counter()
+    unvalidated: collections.Counter[tuple[str, str]] = collections.Counter()
+    for state, matchers, i in captured:
+        frame = frames.frame(i)
+        smalls = {}
+        for size in sizes:
+            with mock.patch.object(engine, 'PROCESS_SIZE', size):
+                smalls[size] = engine.downscale(frame)
+
+        leaves = {
+            leaf: None
+            for matcher in matchers
+            for leaf in _leaves(matcher)
+        }
+        for leaf in leaves:
+            name = describe(leaf)
+            if engine.regions_of(leaf) is None and not args.opaque:
+                unvalidated[state, name] += 1
+                continue
+
+            checked[state, name] += 1
+            # matchers may draw on their frame, give each its own copy
+            expected = bool(leaf(frame.copy()))
+            for size, small in smalls.items():
+                if bool(leaf(small.copy())) != expected:
+                    changed[state, name, size] += 1
+
+    labels = [f'{w}x{h}' for w, h in sizes]
+    print(f'{"state":<24} {"matcher":<48} {"frames":>6}', *labels)
+    for (state, name), n in sorted(checked.items()):
+        counts = [changed[state, name, size] for size in sizes]
+        if any(counts):
+            cells = ' '.join(f'{c:>{len(l)}}' for c, l in zip(counts, labels))
+            print(f'{state:<24} {name[:48]:<48} {n:>6} {cells}')
+
+    for size, label in zip(sizes, labels):
+        n = sum(v for k, v in changed.items() if k[2] == size)
+        print(f'{label}: {n} changed verdicts')
+
+    if unvalidated:
+        # these often compare pixel counts against thresholds which only
+        # hold at the full frame size
+        print('not validated (opaque, see --opaque):')
+        for (state, name), n in sorted(unvalidated.items()):
+            print(f'  {state:<24} {name[:48]:<48} {n:>6}')
+
+    return 1 if changed else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())